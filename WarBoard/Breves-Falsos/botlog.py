@@ -0,0 +1,166 @@
+import multiprocessing
+import logging
+import os
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+# How the bots' logs are handled in this process, one of POLICIES.
+#   - file: Each process appends directly to <folder>/<BotName>.log.
+#   - silent: Logging is a no-op, without any formatting of the messages.
+#   - collected: Messages are sent to a LogSink that writes all the files.
+POLICIES = ['file', 'silent', 'collected']
+
+policy = 'file'
+sink = None
+
+# Folder of the logs by default, next to this file rather than in the current
+# directory, and the folder used in this process.  Bots that store data files
+# put them there too.
+FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+folder = FOLDER
+
+# Loggers that were setup here, which must be reset if the policy changes.
+loggers = set()
+
+
+class NullLogger(object):
+    """Stand-in for a logging.Logger that ignores all messages, and the bots'
+    attempts to configure it."""
+
+    handlers = ()
+
+    def isEnabledFor(self, level):
+        return False
+
+    def _ignore(self, *args, **kwargs):
+        pass
+
+    debug = info = warning = warn = error = exception = critical = log = _ignore
+    addHandler = removeHandler = setLevel = _ignore
+
+
+NULL = NullLogger()
+
+
+class QueueHandler(logging.Handler):
+    """Format records in this process, then send them to the LogSink as plain
+    tuples that are cheap to pickle."""
+
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+
+    def emit(self, record):
+        try:
+            self.queue.put((record.name, self.format(record)))
+        except Exception:
+            self.handleError(record)
+
+
+def configure(name, queue=None, directory=None):
+    """Select the logging policy for the bots created from now on in this
+    process, typically called when a worker process starts, and optionally
+    the folder of the log files."""
+    global policy, sink, folder
+    assert name in POLICIES, "Unknown logging policy %r, expecting one of %r." % (name, POLICIES)
+    assert name != 'collected' or queue is not None, "Collected logging requires the queue of a LogSink."
+    policy, sink = name, queue
+    if directory is not None:
+        folder = directory
+    for n in loggers:
+        log = logging.getLogger(n)
+        for handler in log.handlers[:]:
+            log.removeHandler(handler)
+            handler.close()
+    loggers.clear()
+
+
+def getLogger(name):
+    """Logger for the bot with the given name, according to the policy."""
+    if policy == 'silent':
+        return NULL
+
+    log = logging.getLogger(name)
+    if not log.handlers:
+        try:
+            if policy == 'collected':
+                output = QueueHandler(sink)
+            else:
+                output = logging.FileHandler(filename=os.path.join(folder, name+'.log'))
+            log.addHandler(output)
+            log.setLevel(logging.DEBUG)
+            loggers.add(name)
+        except IOError:
+            pass
+    return log
+
+
+def write(messages, folder, maxBytes, backupCount, batch):
+    """Main loop of the writer process for a LogSink.  All the messages that
+    are waiting are written at once, grouped by file, and files are rotated
+    when they grow past the maximum size."""
+    files = {}
+
+    def rotate(name):
+        files.pop(name).close()
+        path = os.path.join(folder, name + '.log')
+        for i in range(backupCount - 1, 0, -1):
+            if os.path.exists('%s.%i' % (path, i)):
+                os.rename('%s.%i' % (path, i), '%s.%i' % (path, i+1))
+        if backupCount > 0:
+            os.rename(path, path + '.1')
+        else:
+            os.remove(path)
+
+    running = True
+    while running:
+        pending = [messages.get()]
+        try:
+            while len(pending) < batch:
+                pending.append(messages.get_nowait())
+        except queue.Empty:
+            pass
+
+        lines = {}
+        for item in pending:
+            if item is None:
+                running = False
+                continue
+            name, text = item
+            lines.setdefault(name, []).append(text + '\n')
+
+        for name, text in lines.items():
+            f = files.get(name)
+            if f is None:
+                f = files[name] = open(os.path.join(folder, name + '.log'), 'a')
+            f.write(''.join(text))
+            f.flush()
+            if maxBytes and f.tell() >= maxBytes:
+                rotate(name)
+
+    for f in files.values():
+        f.close()
+
+
+class LogSink(object):
+    """Single process that writes the logs of the bots running in all the
+    workers, so they don't contend for the files or interleave lines.  Pass
+    the queue to configure() in each worker.  By default, the files are
+    written to the folder of this process."""
+
+    BATCH = 1024
+
+    def __init__(self, directory=None, maxBytes=16*1024*1024, backupCount=3, context=multiprocessing):
+        self.queue = context.Queue()
+        self.process = context.Process(target=write, args=(self.queue, directory or folder, maxBytes, backupCount, self.BATCH))
+        self.process.daemon = True
+        self.process.start()
+
+    def close(self):
+        """Write all the messages received so far, then stop the process."""
+        self.queue.put(None)
+        self.process.join()
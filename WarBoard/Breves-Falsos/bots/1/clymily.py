@@ -13,26 +13,18 @@ except:
 from itertools import product
 from collections import defaultdict
 from util import Variable
+from counters import Database, Counters, digest
 from math import sqrt
+import botlog
+import atexit
 import random
+import os
 
 from player import Bot, Player
 
 __all__ = ['Clymily']
 
 
-def pickleDumpDict(name, d):
-    """ pickle-dump a variable into a file """
-    try:
-        f = open(name + '.pickle', 'w')
-        pickle.dump(d, f)
-        f.close()
-        return True
-    except Exception, e:
-        # print 'Error writing into', name, ':', str(e)
-        return False
-
-
 def pickleReadDict(name):
     """ pickle-read a (default: dictionary) variable from a file """
     try:
@@ -58,50 +50,75 @@ def maskSome(tup, num):
 
 class StatBase():
     
-    name = 'logs/prob_db'
+    # In the folder of the logs, which doesn't depend on the current directory.
+    name = os.path.join(botlog.folder, 'prob_db')
     
     delay = 50
     
-    def __init__(self):
+    def __init__(self, db=None):
         # populate with dictionaries for all useful cases
+        self._db = db
         self._data = {}
+        self.forget()
         for l in [2,3]:
             # c, t-size
-            self._data[('c', l)] = defaultdict(Variable)
+            self._addTopic(('c', l))
             for numspies in [1,2]:
                 for sabs in range(numspies+1):
                     # m, t-size, num-of-spies, num-of-sabotages
-                    self._data[('m', l, numspies, sabs)] = defaultdict(Variable)            
+                    self._addTopic(('m', l, numspies, sabs))
             for isspy in [True, False]:
                 for team in StatBase._allCanonical(l, isspy):
                     # v, isspy, (isonteam, t-size, numspies)                      
-                    self._data[('v', isspy, team)] = defaultdict(Variable)
+                    self._addTopic(('v', isspy, team))
                     # s, isspy, (isonteam, t-size, numspies)                      
-                    self._data[('s', isspy, team)] = defaultdict(Variable)
+                    self._addTopic(('s', isspy, team))
+
+    def _addTopic(self, topic):
+        """ Variables are read from the database on demand, if there is one. """
+        if self._db is None:
+            self._data[topic] = defaultdict(Variable)
+        else:
+            self._data[topic] = Counters(self._db, topic)
                 
+    def forget(self):
+        """ Drop the memoised estimates, e.g. after changing the variables
+        other than with addSample*. """
+        # (topic, fullkey) -> probability
+        self._estimates = {}
+        # (topic, key) -> set of (topic, fullkey) whose estimate uses it
+        self._dependents = defaultdict(set)
+        
     def load(self):
-        d1 = pickleReadDict(self.name)        
-        d2 = pickleReadDict(self.name + '2')
-        if len(d1) == 0:
-            d1 = self._data
-        if len(d2) == 0:
-            d2 = self._data
-        l1 = sum([len(x) for x in d1.values()])
-        l2 = sum([len(x) for x in d2.values()])        
-        if l1 < l2:
-            self._data = d2
-        else:
-            self._data = d1
-        if l1 == 0:
-            self.store([0])
-        if l2 == 0:
-            self.store([1])
+        """ Open the database of samples, which is shared by all processes.
+        The older pickled files are imported if the database is empty.
+        Samples that other processes add later are only seen once the
+        database is loaded again, see Counters. """
+        self.flush()
+        db = Database(self.name)
+        if len(db.table) == 0 and not db.pending:
+            d1 = pickleReadDict(self.name)        
+            d2 = pickleReadDict(self.name + '2')
+            l1 = sum([len(x) for x in d1.values()])
+            l2 = sum([len(x) for x in d2.values()])        
+            for topic, d in (d2 if l1 < l2 else d1).items():
+                for k, v in d.items():
+                    if v.samples > 0:
+                        db.add(digest((topic, k)), (topic, k), v.total, v.samples)
+            db.flush()
+            db.compact()
+            db = Database(self.name)
+        self.__init__(db)
+        
+    def flush(self):
+        """ Append the new samples to the database, if there is one. """
+        if self._db is not None:
+            self._db.flush()
         
     def store(self, ticker=[0]):
-        if ticker[0] % self.delay == 0:
-            pickleDumpDict(self.name, self._data)
-        if ticker[0] % self.delay == 1:
-            pickleDumpDict(self.name + '2', self._data)
+        """ Append the new samples to the database every few games. """
+        if ticker[0] % self.delay == 0 and self._db is not None:
+            self._db.flush()
         ticker[0] += 1            
         
     def pprint(self):
@@ -134,52 +151,66 @@ class StatBase():
                 
     def addSampleM(self, updown, output, tsize,
                    actors, greens):
-        d = self._data[('m', tsize, len(actors), output)]
+        topic = ('m', tsize, len(actors), output)
         if len(actors) == 1:
             for k in product([actors[0], None], [greens, None]):
-                d[tuple(k)].sample(updown)
+                self._addSample(topic, tuple(k), updown)
         else:
             for k in product([actors[0], None], [actors[1], None], [greens, None]):
-                d[tuple(k)].sample(updown)
+                self._addSample(topic, tuple(k), updown)
             
     def getProbM(self, output, tsize, actors, greens):
-        d = self._data[('m', tsize, len(actors), output)]
+        topic = ('m', tsize, len(actors), output)
         if len(actors) == 1:
-            return self._estimateProb(d, (actors[0], greens))            
+            return self._cachedProb(topic, (actors[0], greens))            
         else:
-            return self._estimateProb(d, (actors[0], actors[1], greens))
+            return self._cachedProb(topic, (actors[0], actors[1], greens))
             
     def addSampleV(self, updown, isspy, team,
                    actor, isleader, greens, vround):
-        d = self._data[('v', isspy, team)]
+        topic = ('v', isspy, team)
         for k in product([actor, None], [isleader, None], [greens, None], [vround, None]):
-            d[tuple(k)].sample(updown)
+            self._addSample(topic, tuple(k), updown)
     
     def getProbV(self, isspy, team, actor, isleader, greens, vround):
-        d = self._data[('v', isspy, team)]
-        return self._estimateProb(d, (actor, isleader, greens, vround))            
+        return self._cachedProb(('v', isspy, team), (actor, isleader, greens, vround))            
         
     def addSampleC(self, updown, tsize,
                    actor, partner, isleader, greens):
-        d = self._data[('c', tsize)]
+        topic = ('c', tsize)
         for k in product([actor, None],[partner, None], [isleader, None], [greens, None]):
-            d[tuple(k)].sample(updown)
+            self._addSample(topic, tuple(k), updown)
     
     def getProbC(self, tsize, actor, partner, isleader, greens):
-        d = self._data[('c', tsize)]
-        return self._estimateProb(d, (actor, partner, isleader, greens))                
+        return self._cachedProb(('c', tsize), (actor, partner, isleader, greens))                
         
     def addSampleS(self, updown, output, isspy,
                    actor, greens, vround):
-        d = self._data[('s', isspy, output)]
+        topic = ('s', isspy, output)
         for k in product([actor, None], [greens, None], [vround, None]):
-            d[tuple(k)].sample(updown)
+            self._addSample(topic, tuple(k), updown)
     
     def getProbS(self, output, isspy, actor, greens, vround):
-        d = self._data[('s', isspy, output)]
-        return self._estimateProb(d, (actor, greens, vround))            
-    
+        return self._cachedProb(('s', isspy, output), (actor, greens, vround))            
+    
+    def _addSample(self, topic, key, updown):
+        """ Any estimate that backs off to this key needs updating. """
+        self._data[topic][key].sample(updown)
+        for k in self._dependents.pop((topic, key), ()):
+            self._estimates.pop(k, None)
+    
+    def _cachedProb(self, topic, fullkey):
+        """ Estimates are memoised until a sample is added to the full key or 
+        any of the looser keys it may back off to, i.e. with some units masked. """
+        key = (topic, fullkey)
+        prob = self._estimates.get(key)
+        if prob is None:
+            prob = self._estimates[key] = self._estimateProb(self._data[topic], fullkey)
+            for k in product(*[[unit, None] for unit in fullkey]):
+                self._dependents[(topic, k)].add(key)
+        return prob
         
+
     def _estimateProb(self, dic, fullkey):
         """ If there is not enough info on the full scenario,
         gradually loosen the constraints to get at least a good prior. """        
@@ -316,6 +347,7 @@ class Statistics(object):
 # global variable initialized here
 allPlayerStats = StatBase()
 allPlayerStats.load()
+atexit.register(allPlayerStats.flush)
 
 
 
@@ -451,6 +483,9 @@ class SubsumptionBot(Bot):
         return random.choice(res) 
     
     def sabotage(self):
+        if not self.spy:
+            # The game also asks the resistance, but ignores the answer.
+            return False
         self.mylastplay = self._action(self.sabotage_behaviors)
         return self.mylastplay
     
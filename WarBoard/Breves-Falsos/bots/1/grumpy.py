@@ -10,8 +10,7 @@ from game import State
 
 import random
 
-import logging
-import logging.handlers
+import botlog
 
 class BotPlan():
 
@@ -86,14 +85,7 @@ class GrumpyBot(Bot):
         self.plan.init(game)
         self.plan.load(self.rawPlan)
 
-        self.log = logging.getLogger(str(self))
-        if not self.log.handlers:
-            try:
-                output = logging.FileHandler(filename='logs/'+str(self)+'.xml')
-                self.log.addHandler(output)
-                self.log.setLevel(logging.DEBUG)
-            except IOError:
-                pass
+        self.log = botlog.getLogger(self.name)
 
     def getPlansFor(self, index, spy):
 
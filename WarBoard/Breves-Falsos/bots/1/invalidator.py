@@ -7,16 +7,12 @@
 """
 
 import random
-import itertools
+import collections
 
 from player import Bot
 from game import State
 from util import Variable
-
-
-def permutations(config):
-    """Returns unique elements from a list of permutations."""
-    return list(set(itertools.permutations(config)))
+import configurations
 
 
 class InvalidatorOracle(object):
@@ -30,9 +26,8 @@ class InvalidatorOracle(object):
         Zero means the selection is not suspicious, and positive values indicate
         higher suspicion levels."""
 
-        all_spies = self.bot.getSpies(config)
-        team_spies = [s for s in self.game.team if s in all_spies]
-        if self.game.leader in all_spies and len(team_spies) != 1:
+        team_spies = configurations.count(config, self.bot.getTeam(self.game.team))
+        if self.bot.getTeam([self.game.leader]) & config and team_spies != 1:
             return 1.0, [(1.0, "%s, assuming a spy, did not pick a mission with spies.")] 
         return 0.0, []
 
@@ -44,7 +39,7 @@ class InvalidatorOracle(object):
         factors = []
 
         all_spies = self.bot.getSpies(config)
-        team_spies = [s for s in self.game.team if s in all_spies]
+        team_spies = configurations.count(config, self.bot.getTeam(self.game.team))
         for p, v in zip(self.game.players, votes):
             # This is a spy, who voted for a mission, that had no spies.
             if p in all_spies and v and not team_spies:
@@ -64,8 +59,8 @@ class InvalidatorOracle(object):
         return score, factors
 
     def sabotages(self, config, sabotaged):
-        spies = [s for s in self.game.team if s in self.bot.getSpies(config)]
-        score = max(0, sabotaged - len(spies)) * 100.0
+        spies = configurations.count(config, self.bot.getTeam(self.game.team))
+        score = max(0, sabotaged - spies) * 100.0
         if score > 0.0:
             return score, [(score, "%s participated in a mission that had %i sabotages." % (self.game.team, sabotaged))]
         else:
@@ -116,10 +111,12 @@ class Invalidator(Bot):
         self.players = players
         self.spies = spies
 
+        # Possible assignments of the spies, as bitmasks of self.others().
+        keys = configurations.space(len(players) - 1, configurations.SPIES[len(players)]).keys
         # Count the number of times each configuration was apparently invalidated.
-        self.invalidations = {k: 0.0 for k in permutations([True, True, False, False])}
+        self.invalidations = collections.OrderedDict((k, 0.0) for k in keys)
         # This is used to help justify decisions in hybrid human/bot matches.
-        self.factors = {k: [] for k in permutations([True, True, False, False])}
+        self.factors = collections.OrderedDict((k, []) for k in keys)
 
     def likeliest(self, configurations):
         ranked = sorted(configurations, key = lambda c: self.invalidations[c])
@@ -153,8 +150,9 @@ class Invalidator(Bot):
         # Count the scores of configurations where no spies are selected. 
         scores = []
         matches = []
+        selected = self.getTeam(team)
         for config in self.invalidations:
-            if len([s for s in team if s in self.getSpies(config)]) == 0:
+            if not config & selected:
                 scores.append(self.invalidations[config])
                 matches.append(config)
         if not scores:
@@ -183,10 +181,13 @@ class Invalidator(Bot):
             self.factors[config].extend(factors)
 
     def getSpies(self, config):
-        return set([player for player, spy in zip(self.others(), config) if spy])
+        return set(configurations.members(self.others(), config))
 
     def getResistance(self, config):
-        return set([player for player, spy in zip(self.others(), config) if not spy])
+        return set(configurations.members(self.others(), ~config))
+
+    def getTeam(self, team):
+        return configurations.mask(self.others(), team)
 
     def onMissionComplete(self, sabotaged):
         for config in self.invalidations:
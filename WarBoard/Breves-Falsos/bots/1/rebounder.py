@@ -8,6 +8,7 @@
 import random
 
 from player import Bot
+import configurations
 
 
 __all__ = ['Rebounder']
@@ -50,10 +51,12 @@ class Rebounder(Bot):
             # weak_configs is an upper bound (and always true) - it assumes spies may or may not defect
             # vote_configs assumes a spy will vote against any team that does not contain a spy
             # select_configs assumes a spy will always choose a team consisting of himself plus non-spies
-            self.strong_configs = range(6)
-            self.weak_configs = range(6)
-            self.vote_configs = range(6)
-            self.select_configs = range(6)
+            # each config is a bitmask of the spies among self.others(), see configurations.py
+            configs = configurations.space(len(players) - 1, configurations.SPIES[len(players)]).combinations
+            self.strong_configs = list(configs)
+            self.weak_configs = list(configs)
+            self.vote_configs = list(configs)
+            self.select_configs = list(configs)
 
     def configs_to_string(self, configs):
         """ Return the possible spy pairs for the given list of configs (from the point of view of self) 
@@ -66,24 +69,21 @@ class Rebounder(Bot):
         return outstr
 
     def get_spies(self, v):
-        """ Get the list of spy indices corresponding to config[v]
+        """ Get the list of spy indices corresponding to config v
             Never includes me. Not used if I am a spy.
         """
-        notme = [p for p in range(5) if p != self.index]
-        if v==0:   return [notme[0], notme[1]]
-        elif v==1: return [notme[0], notme[2]]
-        elif v==2: return [notme[0], notme[3]]
-        elif v==3: return [notme[1], notme[2]]
-        elif v==4: return [notme[1], notme[3]]
-        elif v==5: return [notme[2], notme[3]]
-        else: assert(False)
+        return [p.index for p in configurations.members(self.others(), v)]
 
     def get_resistance(self,v):
-        """ Get the list of resistance indices corresponding to config[v]. 
+        """ Get the list of resistance indices corresponding to config v. 
             Never includes me. Not used if I am a spy.
         """
-        notme = [p for p in range(5) if p != self.index]
-        return [p for p in notme if p not in self.get_spies(v)]
+        return [p.index for p in configurations.members(self.others(), ~v)]
+
+    def get_team(self, team):
+        """ Get the bitmask of the players in the team, to match against configs.
+        """
+        return configurations.mask(self.others(), team)
 
     def select(self, players, count):
         """ Select players for a mission I will lead.
@@ -114,17 +114,17 @@ class Rebounder(Bot):
             if self.game.tries == 5:
                 return True
             self.select_configs = [c for c in self.select_configs if self.select_compatible(c,team,self.game.leader)] 
-            ti = [p.index for p in team]
+            ti = self.get_team(team)
             # Is the team compatible with a config which contains no spy?
             if len(self.strong_configs) == 0:
-                vote = len([c for c in self.weak_configs if self.compatible(c,ti,0,False)]) > 0
+                vote = len(configurations.atLeast(self.weak_configs, ti, 0)) > 0
             else:
-                vote = len([c for c in self.strong_configs if self.compatible(c,ti,0,True)]) > 0
+                vote = len(configurations.exact(self.strong_configs, ti, 0)) > 0
             if vote: votestring = "for"
             else: votestring = "against" 
-            # logging.debug("Me: " + str(self.index) + ". Try: " + str(self.game.tries) + ". Vote " + votestring + " Team: " + str(ti) \
-            #    + ". Possible strong configs: " + self.configs_to_string([c for c in self.strong_configs if self.compatible(c,ti,0,True)]) \
-            #    + ". Possible weak configs: " + self.configs_to_string([c for c in self.weak_configs if self.compatible(c,ti,0,False)]))
+            # logging.debug("Me: " + str(self.index) + ". Try: " + str(self.game.tries) + ". Vote " + votestring + " Team: " + str([p.index for p in team]) \
+            #    + ". Possible strong configs: " + self.configs_to_string(configurations.exact(self.strong_configs, ti, 0)) \
+            #    + ". Possible weak configs: " + self.configs_to_string(configurations.atLeast(self.weak_configs, ti, 0)))
             return vote
 
     def onVoteComplete(self, votes):
@@ -135,38 +135,29 @@ class Rebounder(Bot):
         """ Is config compatible with the voting assuming a spy will vote against any team that does not contain a spy?
             Also assume that all spies will vote against any team on the 4th try and any resistace will vote for.
         """
-        forids = [players[i].index for i in range(5) if votes[i] == True] 
-        num_selected_spies = len([s for s in team if s.index in self.get_spies(config)])
-        num_spyvotesfor = len([p for p in self.get_spies(config) if p in forids])
-        return (num_selected_spies > 0 or self.game.tries == 5) and num_spyvotesfor == 2 \
+        forids = self.get_team([players[i] for i in range(len(players)) if votes[i] == True])
+        num_selected_spies = configurations.count(config, self.get_team(team))
+        num_spyvotesfor = configurations.count(config, forids)
+        return (num_selected_spies > 0 or self.game.tries == 5) and num_spyvotesfor == configurations.POPCOUNT[config] \
             or num_selected_spies == 0 and num_spyvotesfor == 0
 
     def select_compatible(self, config, team, leader):
         """ Is config compatible with the selection assuming a spy will 
             always propose a team consisting of himself plus non-spies
         """
-        num_selected_spies = len([s for s in team if s.index in self.get_spies(config)])
+        num_selected_spies = configurations.count(config, self.get_team(team))
         return leader.index in [p.index for p in team] and \
-            leader.index in self.get_spies(config) and \
+            bool(config & self.get_team([leader])) and \
             num_selected_spies == 1
 
-    def compatible(self, config, selectedplayerindices, sabotage, strong):
-        """ Is config compatible with the mission result assuming spies always lie (strong == True)
-            or assuming spies may or may not lie (strong == False)
-        """
-        num_selected_spies = len([s for s in selectedplayerindices if s in self.get_spies(config)])
-        if strong: 
-            return num_selected_spies == sabotage
-        else:
-            return num_selected_spies >= sabotage            
-
     def onMissionComplete(self, sabotaged):
         """ Update legal strong and weak configs given a mission result.
         """
         if not self.spy:
-            spi = [p.index for p in self.game.team]
-            self.strong_configs = [c for c in self.strong_configs if self.compatible(c,spi,sabotaged,True)] 
-            self.weak_configs = [c for c in self.weak_configs if self.compatible(c,spi,sabotaged,False)] 
+            # strong configs assume spies always lie, weak configs that spies may or may not lie
+            spi = self.get_team(self.game.team)
+            self.strong_configs = configurations.exact(self.strong_configs, spi, sabotaged)
+            self.weak_configs = configurations.atLeast(self.weak_configs, spi, sabotaged)
             # logging.debug("Me: " + str(self.index) + ". Mission result: " + str(sabotaged) + " for team " + str(spi) +\
             #    ". Possible strong configs: " + self.configs_to_string(self.strong_configs) + \
             #    ". Possible weak configs: " + self.configs_to_string(self.weak_configs) + \
@@ -9,7 +9,7 @@ from player import Bot
 from game import State
 import random
 import math
-import itertools
+import configurations
 
 
 class GameCombinations:
@@ -27,30 +27,27 @@ class GameCombinations:
 		#				indices[k] = indices[k-1]+1
 		#			break
 		# next line do the same. Should work for any number of players and spies
-		self.combinations = map(lambda x: [True if y in x else False for y in range(playerCnt)], itertools.combinations(range(playerCnt),spyCnt))
+		# each combination is a bitmask of the spies by player index, see configurations.py
+		self.playerCnt = playerCnt
+		self.combinations = list(configurations.space(playerCnt, spyCnt).combinations)
 	
 	def addSabotage(self, team, sabotage):
 		# remove those combinations which are not possible for given combination of team and number of sabotages
-		reducedCombinations = []
-		for c in self.combinations:
-			if self._countOfSpies(team, c) >= sabotage:
-				reducedCombinations.append(c)
-		self.combinations = reducedCombinations
+		self.combinations = configurations.atLeast(self.combinations, self._mask(team), sabotage)
 		
-	def _countOfSpies(self, team, row):
+	def _mask(self, team):
 		r = 0
 		for p in team:
-			if row[p.index] == True:
-				r += 1
+			r |= 1 << p.index
 		return r
 				
 	def getProbabilities(self):
 		# returns list of probabilities for player calculated from rest team combinations
 		cnt = len(self.combinations)
-		res = [0 for i in range(len(self.combinations[0]))] 
+		res = [0 for i in range(self.playerCnt)] 
 		for c in self.combinations:
-			for j in range(len(c)):
-				if c[j]:
+			for j in range(self.playerCnt):
+				if c >> j & 1:
 					res[j] += 1
 		return map(lambda x: float(x)/cnt, res)
 		
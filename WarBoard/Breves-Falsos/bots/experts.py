@@ -1,12 +1,8 @@
 import random
-import itertools
+import collections
 
 from player import Bot
-
-
-def permutations(config):
-    """Returns unique elements from a list of permutations."""
-    return list(set(itertools.permutations(config)))
+import configurations
 
 
 class Suspicious(Bot):
@@ -19,11 +15,10 @@ class Suspicious(Bot):
         Zero means the selection is not suspicious, and positive values indicate
         higher suspicion levels."""
 
-        all_spies = self.getSpies(config)
-        team_spies = [s for s in self.game.team if s in all_spies]
-        if self.game.leader in all_spies and len(team_spies) == 0:
+        team_spies = configurations.count(config, self.getTeam(self.game.team))
+        if self.getTeam([self.game.leader]) & config and team_spies == 0:
             return 1.0, [(1.0, "%s, assuming a spy, did not pick a mission with spies.")] 
-        if len(team_spies) >= 2:
+        if team_spies >= 2:
             return 0.5, [(0.5, "%s, assuming a spy, picked a mission with two spies!")]
         return 0.0, []
 
@@ -33,17 +28,17 @@ class Suspicious(Bot):
         suspicion levels."""
 
         all_spies = self.getSpies(config)
-        team_spies = [s for s in self.game.team if s in all_spies]
+        team_spies = configurations.count(config, self.getTeam(self.game.team))
 
         score, factors = 0.0, []        
         for p, v in zip(self.game.players, votes):            
             if p in all_spies and v and not team_spies:
                 score += 1.0
                 factors.append((1.0, "%s, assuming a spy, voted for a mission that had no assumed spies." % (p.name)))
-            if p in all_spies and not v and len(team_spies) == 1:
+            if p in all_spies and not v and team_spies == 1:
                 score += 1.0
                 factors.append((1.0, "%s, assuming a spy, did not vote a mission that had an assumed spy." % (p.name)))
-            if p in all_spies and v and len(team_spies) > 1:
+            if p in all_spies and v and team_spies > 1:
                 score += 0.5
                 factors.append((0.5, "%s, assuming a spy, voted a mission with multiple assumed spy." % (p.name)))
             if self.game.tries == 5 and p not in all_spies and not v:
@@ -55,8 +50,8 @@ class Suspicious(Bot):
         return score, factors
 
     def oracle_sabotages(self, config, sabotaged):
-        spies = [s for s in self.game.team if s in self.getSpies(config)]
-        score = max(0, sabotaged - len(spies)) * 100.0
+        spies = configurations.count(config, self.getTeam(self.game.team))
+        score = max(0, sabotaged - spies) * 100.0
         if score > 0.0:
             return score, [(score, "%s participated in a mission that had %i sabotages." % (self.game.team, sabotaged))]
         else:
@@ -86,10 +81,12 @@ class Suspicious(Bot):
     def onGameRevealed(self, players, spies):
         self.spies = spies
 
+        # Possible assignments of the spies, as bitmasks of self.others().
+        keys = configurations.space(len(players) - 1, configurations.SPIES[len(players)]).keys
         # Count the number of times each configuration was apparently invalidated.
-        self.invalidations = {k: 0.0 for k in permutations([True, True, False, False])}
+        self.invalidations = collections.OrderedDict((k, 0.0) for k in keys)
         # This is used to help justify decisions in hybrid human/bot matches.
-        self.factors = {k: [] for k in permutations([True, True, False, False])}
+        self.factors = collections.OrderedDict((k, []) for k in keys)
 
     def likeliest(self):
         ranked = sorted(self.invalidations.keys(), key = lambda c: self.invalidations[c])
@@ -114,8 +111,9 @@ class Suspicious(Bot):
 
         # Count the scores of configurations where no spies are selected. 
         scores, matches = [], []
+        selected = self.getTeam(team)
         for config in self.invalidations:
-            if len([s for s in team if s in self.getSpies(config)]) == 0:
+            if not config & selected:
                 scores.append(self.invalidations[config])
                 matches.append(config)
         if not scores:
@@ -132,14 +130,13 @@ class Suspicious(Bot):
             self.factors[config].extend(factors)
 
     def getSpies(self, config):
-        assert len(config) == 4
-        assert all([type(c) is bool for c in config])
-        return set([player for player, spy in zip(self.others(), config) if spy])
+        return set(configurations.members(self.others(), config))
 
     def getResistance(self, config):
-        assert len(config) == 4
-        assert all([type(c) is bool for c in config])
-        return set([player for player, spy in zip(self.others(), config) if not spy])
+        return set(configurations.members(self.others(), ~config))
+
+    def getTeam(self, team):
+        return configurations.mask(self.others(), team)
 
     def onMissionComplete(self, sabotaged):
         for config in self.invalidations:
@@ -1,12 +1,7 @@
 import random
-import itertools
 
 from player import Bot
-
-
-def permutations(config):
-    """Returns unique elements from a list of permutations."""
-    return list(set(itertools.permutations(config)))
+import configurations
 
 
 class Simpleton(Bot):
@@ -15,25 +10,21 @@ class Simpleton(Bot):
 
     def onGameRevealed(self, players, spies):
         self.spies = spies
-        self.configurations = permutations([True, True, False, False])
+        self.configurations = self.space(players).permutations
+
+    def space(self, players):
+        """Possible assignments of the spies among the other players, as
+        bitmasks of the seats in self.others()."""
+        return configurations.space(len(players) - 1, configurations.SPIES[len(players)])
 
     def getSpies(self, config):
-        assert len(config) == 4
-        assert all([type(c) is bool for c in config])
-        return [player for player, spy in zip(self.others(), config) if spy]
+        return configurations.members(self.others(), config)
 
     def getResistance(self, config):
-        assert len(config) == 4
-        assert all([type(c) is bool for c in config])
-        return [player for player, spy in zip(self.others(), config) if not spy]
-
-    def _validateSpies(self, config, team, sabotaged):
-        spies = [s for s in team if s in self.getSpies(config)]
-        return len(spies) >= sabotaged
+        return configurations.members(self.others(), ~config)
 
-    def _validateNoSpies(self, config, team):
-        spies = [s for s in team if s in self.getSpies(config)]
-        return len(spies) == 0
+    def getTeam(self, team):
+        return configurations.mask(self.others(), team)
 
     def select(self, players, count):
         if self.configurations:
@@ -46,14 +37,14 @@ class Simpleton(Bot):
             resistance = [p for p in self.others() if p not in self.spies]
             return [self] + random.sample(resistance, count - 1)
 
-    def _select(self, configurations):
+    def _select(self, configs):
         """This is a hook for inserting more advanced reasoning on top of the
         maximal amount of logical reasoning you can perform."""
-        return random.choice(configurations)
+        return random.choice(configs)
         
     def _acceptable(self, team):
         """Determine if this team is an acceptable one to vote for..."""
-        current = [c for c in self.configurations if self._validateNoSpies(c, team)]
+        current = configurations.exact(self.configurations, self.getTeam(team), 0)
         return bool(len(current) > 0)
 
     def vote(self, team):
@@ -75,7 +66,7 @@ class Simpleton(Bot):
 
     def onMissionComplete(self, sabotaged):
         before = len(self.configurations)
-        self.configurations = [c for c in self.configurations if self._validateSpies(c, self.game.team, sabotaged)]
+        self.configurations = configurations.atLeast(self.configurations, self.getTeam(self.game.team), sabotaged)
         after = len(self.configurations)
         # self.log.debug("%s: Filtered out %i configurations, %i left." % ("SPY" if self.spy else "RST", after - before, after))
         # self.log.debug("%r" % [self.getSpies(c) for c in self.configurations])
@@ -106,9 +97,9 @@ class Bounder(Simpleton):
 
         # The set of possible assignments around the table, for:
         #   - PESSIMISTIC: All teams except those 100% proven to be spies.
-        self.pessimistic = permutations([True, True, False, False])
+        self.pessimistic = self.space(players).permutations
         #   - OPTIMISTIC: The teams we don't suspect to be spies without guarantees.
-        self.optimistic = permutations([True, True, False, False])
+        self.optimistic = self.space(players).permutations
 
     def select(self, players, count):
         if self.optimistic:
@@ -118,17 +109,18 @@ class Bounder(Simpleton):
             config = random.choice(self.pessimistic)
         return [self] + random.sample(self.getResistance(config), count-1)
 
-    def _validate(self, config, team, sabotaged, optimistic):
-        spies = [s for s in team if s in self.getSpies(config)]
+    def _validate(self, configs, team, sabotaged, optimistic):
+        """Keep the configurations where spies always sabotage if optimistic,
+        or where they may or may not have otherwise."""
         if optimistic:
-            return len(spies) == sabotaged
+            return configurations.exact(configs, self.getTeam(team), sabotaged)
         else:
-            return len(spies) >= sabotaged
+            return configurations.atLeast(configs, self.getTeam(team), sabotaged)
 
     def vote(self, team): 
         # Determine if this is an acceptable thing to vote for...
-        def acceptable(configurations, optimistic):
-            current = [c for c in configurations if self._validate(c, team, 0, optimistic)]
+        def acceptable(configs, optimistic):
+            current = self._validate(configs, team, 0, optimistic)
             return bool(len(current) > 0)
 
         # Try our best-case options first, otherwise fall back...
@@ -143,8 +135,8 @@ class Bounder(Simpleton):
         if self.spy:
             return
 
-        self.optimistic = [c for c in self.optimistic if self._validate(c, self.game.team, sabotaged, True)]
-        self.pessimistic = [c for c in self.pessimistic if self._validate(c, self.game.team, sabotaged, False)]
+        self.optimistic = self._validate(self.optimistic, self.game.team, sabotaged, True)
+        self.pessimistic = self._validate(self.pessimistic, self.game.team, sabotaged, False)
 
     def sabotage(self):
         return True
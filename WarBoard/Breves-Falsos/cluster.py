@@ -0,0 +1,181 @@
+import threading
+import traceback
+import socket
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from multiprocessing.connection import Listener, Client
+
+# Functions and results are sent by reference to this module, which needs to
+# be imported even if the coordinator runs as the competition.py script.
+import competition
+import botlog
+
+
+# Default secret used to authenticate workers.  Since it's public and peers
+# unpickle what they receive, it's only accepted for loopback addresses.
+AUTHKEY = b'resistance'
+
+
+def parseAddress(text):
+    """Convert a string like 'localhost:7777' into an address tuple."""
+    host, port = text.rsplit(':', 1)
+    return (host or 'localhost', int(port))
+
+
+def isLoopback(address):
+    """Whether the address only accepts connections from this host."""
+    try:
+        return socket.gethostbyname(address[0]).startswith('127.')
+    except socket.error:
+        return False
+
+
+def checkAuthkey(address, authkey):
+    """Refuse the public AUTHKEY for connections across the network, where
+    anyone could use it to run code on the coordinator or the workers."""
+    if authkey == AUTHKEY and not isLoopback(address):
+        raise ValueError("A secret authkey is required for the non-loopback address %s:%i." % address)
+
+
+class RemoteResult(object):
+    """Result of a block of games sent to a remote worker, with the same API as
+    the results returned by multiprocessing.Pool.apply_async()."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.event = threading.Event()
+        self.success = None
+        self.value = None
+
+    def ready(self):
+        return self.event.is_set()
+
+    def successful(self):
+        assert self.ready(), "The remote result is not available yet."
+        return self.success
+
+    def get(self):
+        self.event.wait()
+        if not self.success:
+            raise RuntimeError("Remote worker failed to play the games:\n%s" % (self.value))
+        return self.value
+
+    def set(self, success, value):
+        self.success, self.value = success, value
+        if success and self.callback:
+            self.callback(value)
+        self.event.set()
+
+
+class Coordinator(object):
+    """Pool of remote workers connected over TCP, which can be passed to the
+    CompetitionRunner instead of a multiprocessing.Pool.  Blocks of games are
+    queued and handed out to whichever worker is available.  If a worker
+    disconnects before returning its results, its block is queued again.
+
+    Workers are launched separately on any host with `competition.py --worker`
+    and must be able to import the bots from the same paths.  They write the
+    logs of the bots according to the given policy, see botlog.py."""
+
+    def __init__(self, address, bots, authkey=AUTHKEY, logs='file'):
+        checkAuthkey(address, authkey)
+        self.bots = bots
+        self.logs = logs
+        self.authkey = authkey
+        self.tasks = queue.Queue()
+        self.connections = []
+        self.closed = False
+
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        thread = threading.Thread(target=self.accept)
+        thread.daemon = True
+        thread.start()
+
+    def accept(self):
+        while not self.closed:
+            try:
+                connection = self.listener.accept()
+            except Exception:
+                # Either the listener was closed, or authentication failed.
+                continue
+            self.connections.append(connection)
+            thread = threading.Thread(target=self.serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def serve(self, connection):
+        """Send blocks of games to a single worker until it disconnects."""
+        try:
+            connection.send((self.bots, self.logs))
+        except (EOFError, IOError, socket.error):
+            return
+
+        while not self.closed:
+            task = self.tasks.get()
+            result, name, args = task
+            try:
+                connection.send((name, args))
+                success, value = connection.recv()
+            except (EOFError, IOError, socket.error):
+                # The worker disappeared, so give its block to another one.
+                self.tasks.put(task)
+                break
+            except Exception:
+                success, value = False, traceback.format_exc()
+            result.set(success, value)
+
+        if connection in self.connections:
+            self.connections.remove(connection)
+
+    def apply_async(self, func, args=(), callback=None):
+        """Queue a call for the workers, which is sent by name since the worker
+        will look up the function in its own competition module."""
+        result = RemoteResult(callback)
+        self.tasks.put((result, func.__name__, args))
+        return result
+
+    def terminate(self):
+        self.closed = True
+        for connection in self.connections[:]:
+            connection.close()
+        self.listener.close()
+
+
+def work(address, authkey=AUTHKEY, retry=1.0):
+    """Main loop of a remote worker, which plays the blocks of games sent by
+    a coordinator.  The worker reconnects when a competition finishes, so it
+    can be reused across many runs.  The logging policy of the coordinator is
+    applied before the first block of each run."""
+    checkAuthkey(address, authkey)
+    sink = None
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+        except (EOFError, IOError, socket.error):
+            time.sleep(retry)
+            continue
+
+        try:
+            bots, logs = connection.recv()
+            if logs == 'collected' and sink is None:
+                sink = botlog.LogSink()
+            # Unlike competition.setup(), keep SIGINT so the worker can be stopped.
+            botlog.configure(logs, sink and sink.queue)
+            competition.getCompetitors(bots)
+            while True:
+                name, args = connection.recv()
+                try:
+                    value = getattr(competition, name)(*args)
+                except Exception:
+                    connection.send((False, traceback.format_exc()))
+                else:
+                    connection.send((True, value))
+        except (EOFError, IOError, socket.error):
+            connection.close()
+            time.sleep(retry)
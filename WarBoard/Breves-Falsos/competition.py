@@ -4,32 +4,41 @@ from __future__ import print_function
 
 import multiprocessing
 import collections
+import array
 import itertools
 import importlib
+import operator
+import json
 import random
+import atexit
 import math
+import time
 import sys
 import os
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 from player import Bot
 from game import Game
-from util import Variable
-
-
-class CompetitionStatistics:
-    def __init__(self):
-        self.resWins = Variable()
-        self.spyWins = Variable()
-        self.resVotesRes = Variable()
-        self.resVotesSpy = Variable()
-        self.spyVotesRes = Variable()
-        self.spyVotesSpy = Variable()
-        self.spyVoted = Variable()
-        self.resVoted = Variable()
-        self.spySelected = Variable()
-        self.resSelected = Variable()
-        self.spySelection = Variable()
-        self.resSelection = Variable()
+from util import Variable, Difference, intervals
+from schedule import Schedule, BalancedSchedule, ROLES, balance
+from latency import Latency
+from deadline import Deadlines, Timeout
+from botlog import LogSink
+import botlog
+import recorder
+import telemetry
+import opponents
+
+
+class CompetitionSummary(collections.namedtuple('CompetitionSummary', [
+            'resWins', 'spyWins', 'resVotesRes', 'resVotesSpy', 'spyVotesRes', 'spyVotesSpy',
+            'spyVoted', 'resVoted', 'spySelected', 'resSelected', 'spySelection', 'resSelection',
+            'forfeits'])):
+    """Snapshot of the statistics for one bot, with a Variable per counter."""
 
     def total(self):
         return Variable(
@@ -37,9 +46,79 @@ class CompetitionStatistics:
                 self.resWins.samples + self.spyWins.samples
         )
 
+
+class CompetitionStatistics(object):
+    """Table of statistics for all the bots in a competition, stored as a flat
+    array with one row per bot.  Each counter in the row uses two columns, one
+    for the total and one for the number of samples."""
+
+    COLUMNS = dict((c, 2*i) for i, c in enumerate(CompetitionSummary._fields))
+    WIDTH = 2 * len(CompetitionSummary._fields)
+
+    def __init__(self, names=()):
+        self.names = []
+        self.rows = {}
+        self.data = array.array('d')
+        for name in names:
+            self.row(name)
+
+    def row(self, name):
+        """Offset of the row for the given bot, which is added if necessary."""
+        offset = self.rows.get(name)
+        if offset is None:
+            offset = self.rows[name] = len(self.data)
+            self.names.append(name)
+            self.data.extend([0.0] * self.WIDTH)
+        return offset
+
+    def sample(self, name, counter, value):
+        i = self.row(name) + self.COLUMNS[counter]
+        self.data[i] += value
+        self.data[i+1] += 1
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def __getitem__(self, name):
+        i = self.row(name)
+        return CompetitionSummary(*[Variable(self.data[j], int(self.data[j+1])) for j in range(i, i+self.WIDTH, 2)])
+
+    def items(self):
+        return [(name, self[name]) for name in self.names]
+
+    def intervals(self):
+        """Estimate and error of the total score for all bots at once, as a
+        dictionary from bot names to tuples."""
+        res, spy = self.COLUMNS['resWins'], self.COLUMNS['spyWins']
+        totals = [self.data[i+res] + self.data[i+spy] for i in range(0, len(self.data), self.WIDTH)]
+        samples = [self.data[i+res+1] + self.data[i+spy+1] for i in range(0, len(self.data), self.WIDTH)]
+        return dict(zip(self.names, intervals(totals, samples)))
+
+    def select(self, names):
+        """Copy of the table with only the rows of the given bots."""
+        result = CompetitionStatistics()
+        for name in names:
+            if name in self.rows:
+                i, j = self.rows[name], result.row(name)
+                result.data[j:j+self.WIDTH] = self.data[i:i+self.WIDTH]
+        return result
+
     def __iadd__(self, other):
-        for k, v in self.__dict__.items():
-            v += other.__dict__[k]
+        # When the rows are in the same order, merging is a single vector sum.
+        if self.names[:len(other.names)] != other.names:
+            for name in other.names:
+                self.row(name)
+            data = array.array('d', [0.0]) * len(self.data)
+            for name, j in other.rows.items():
+                i = self.rows[name]
+                data[i:i+self.WIDTH] = other.data[j:j+self.WIDTH]
+            other = CompetitionStatistics()
+            other.data = data
+        n = len(other.data)
+        self.data[:n] = array.array('d', map(operator.add, self.data[:n], other.data))
         return self
 
 
@@ -47,81 +126,286 @@ class CompetitionRound(Game):
 
     def __init__(self, *args):
         super(CompetitionRound, self).__init__(*args)
-        self.statistics = collections.defaultdict(CompetitionStatistics)
+        self.statistics = CompetitionStatistics()
 
     def onPlayerVoted(self, player, vote, leader, team):
-        s = self.statistics[player.name]
+        s = self.statistics
 
         spies = [t for t in team if t.spy]
         if player.spy:
             # When there are spies, we expect support.
             if spies:    
-                s.spyVotesRes.sample(int(vote))
+                s.sample(player.name, 'spyVotesRes', int(vote))
             # For missions without spies, we expect down vote.
             else:
-                s.spyVotesSpy.sample(int(not vote))
+                s.sample(player.name, 'spyVotesSpy', int(not vote))
             return
 
         # When there are no spies, we expect support.
         if not spies:    
-            s.resVotesRes.sample(int(vote))
+            s.sample(player.name, 'resVotesRes', int(vote))
         # For missions with spies, we expect down vote.
         else:
-            s.resVotesSpy.sample(int(not vote))
+            s.sample(player.name, 'resVotesSpy', int(not vote))
 
         # Everyone on the mission hopes to be approved.
         for p in team:
-            s = self.statistics[p.name]
             if p.spy:
-                s.spyVoted.sample(int(vote))
+                s.sample(p.name, 'spyVoted', int(vote))
             else:
-                s.resVoted.sample(int(vote))
+                s.sample(p.name, 'resVoted', int(vote))
    
     def onPlayerSelected(self, player, team):
         # TODO: Detailed statistics indicating selection by each other
         # player, and whether or not the other is playing as spy.
         spies = [t for t in team if t.spy]
         
-        s = self.statistics[player.name]
+        s = self.statistics
         if player.spy:
-            s.spySelection.sample(int(len(spies) > 0))
+            s.sample(player.name, 'spySelection', int(len(spies) > 0))
         else:
-            s.resSelection.sample(int(len(spies) == 0))
+            s.sample(player.name, 'resSelection', int(len(spies) == 0))
 
         for bot in self.bots:
-            s = self.statistics[bot.name]
             if bot.spy:
-                s.spySelected.sample(int(bot in team))
+                s.sample(bot.name, 'spySelected', int(bot in team))
             else:
-                s.resSelected.sample(int(bot in team))
+                s.sample(bot.name, 'resSelected', int(bot in team))
 
 
-def setup():
+def setup(logs='file', queue=None, shared=None, folder=None):
     import signal
     signal.signal(signal.SIGINT, signal.SIG_IGN)
-
-
-def play(args):
-    (players, roles) = args
+    botlog.configure(logs, queue, folder)
+    if shared is not None:
+        telemetry.attach(shared)
+
+
+# Folders with the bots that ship with the framework, relative to this file.
+BOT_FOLDERS = ['bots', 'bots/0', 'bots/1']
+
+
+def preload():
+    """Import all the bots that ship with the framework, as they would be by
+    getCompetitors() from their filename.  This includes the opponent models
+    that some bots load from disk on import.  Modules that fail to import, for
+    example due to missing dependencies, are skipped."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    modules = []
+    for folder in BOT_FOLDERS:
+        path = os.path.join(root, folder)
+        if path not in sys.path:
+            sys.path.append(path)
+        for filename in sorted(os.listdir(path)):
+            name, extension = os.path.splitext(filename)
+            if extension != '.py' or name.startswith('__'):
+                continue
+            try:
+                importlib.import_module(name)
+                modules.append(name)
+            except Exception:
+                pass
+    return modules
+
+
+_pool = None
+
+def sharedPool(processes=None, logs='file'):
+    """Long-lived pool of worker processes that many competitions can share,
+    via the pool argument of CompetitionRunner, to avoid the startup cost of
+    processes and bot imports on each run.  The workers are created from a
+    process that has already imported all the bots, either a fork-server if
+    available or this process itself.  The logging policy of the bots is
+    fixed when the pool is created.  The models of the learner bots are reset
+    in the workers before each competition, see opponents.reset(), so the
+    results are the same as with a new pool."""
+    global _pool
+    if _pool is None:
+        modules = preload()
+        processes = processes or multiprocessing.cpu_count()
+        context = multiprocessing
+        if hasattr(multiprocessing, 'get_context') and 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['competition'] + modules)
+        sink = LogSink(context=context) if logs == 'collected' else None
+        _pool = context.Pool(processes, setup, (logs, sink and sink.queue, None, botlog.folder))
+        if sink:
+            atexit.register(sink.close)
+        atexit.register(_pool.terminate)
+    return _pool
+
+
+def playGame(args, latency=None, deadlines=None, records=None, id=None):
+    """Simulate a single game with the given players and roles.  The random
+    number generator used by the engine and the bots is seeded beforehand, so
+    the game can be reproduced exactly in any process.
+
+    A bot that runs out of time forfeits the game, which is then lost by its
+    side and recorded in its statistics and its log.  With a Recorder, all the
+    events of the game are also stored under the given id."""
+    (players, roles, seed) = args
+    if seed is not None:
+        random.seed(seed)
     g = CompetitionRound(players, roles)
     g.channel = None
-    g.run()
+    if latency is not None:
+        latency.instrument(g)
+    if deadlines is not None:
+        deadlines.instrument(g)
+    if records is not None:
+        records.instrument(g, id, seed)
+
+    g.forfeit = None
+    try:
+        g.run()
+        won = g.won
+    except Timeout as t:
+        g.forfeit = t
+        t.bot.log.warning("Forfeited the game: %s" % (t))
+        g.statistics.sample(t.bot.name, 'forfeits', 1)
+        won = t.bot.spy
+    g.resistanceWon = won
+    if records is not None:
+        records.complete(g, won, g.forfeit.bot if g.forfeit else None)
 
     for b in g.bots:
-        s = g.statistics.get(b.name)
         if b.spy:
-            s.spyWins.sample(int(not g.won))
+            g.statistics.sample(b.name, 'spyWins', int(not won))
         else:
-            s.resWins.sample(int(g.won))
-    return g.statistics
+            g.statistics.sample(b.name, 'resWins', int(won))
+    return g
+
+
+def play(args, latency=None, deadlines=None):
+    return playGame(args, latency, deadlines).statistics
+
+
+def playPair(args, alternative, latency=None, deadlines=None, records=None, index=None):
+    """Play the same game twice, with the same seed, the second time with the
+    bot in the given seat replaced by an alternative.  Returns both games."""
+    (players, roles, seed, seat) = args
+    ids = (recorder.key(index, 0), recorder.key(index, 1)) if records else (None, None)
+    first = playGame((players, roles, seed), latency, deadlines, records, ids[0])
+    second = playGame((players[:seat] + (alternative,) + players[seat+1:], roles, seed), latency, deadlines, records, ids[1])
+    return first, second
+
+
+# Competition that the last block of games in this process belonged to.
+_run = None
+
+
+def playBlock(games, configure=None, latency=False, deadlines=None, alternative=None, recording=None, first=0,
+              sharing=None, snapshots=None, run=None):
+    """Play a whole block of games in a worker process, and merge the results
+    locally so that only a single aggregate is sent back to the runner.  With
+    an alternative bot, the games are played in pairs, see playPair(), and only
+    the alternative is counted from the second game of each pair.
+
+    The events of the games are recorded if a tuple with the folder and the
+    names of the bots is given, using the index of the games in the schedule
+    starting from the first.  With the address and key of an opponents.Store,
+    the models of the learner bots are merged with the other workers after
+    the block, and before it unless that was done recently.  Those models are
+    first restored from the latest snapshots in a folder, if one is given.
+    They're reset when the first block of a new competition arrives, since
+    the worker may have played others before, see sharedPool()."""
+    global _run
+    start = time.time()
+    if run != _run:
+        opponents.reset()
+        _run = run
+    if configure:
+        function, args = configure
+        function(*args)
+    if snapshots:
+        opponents.warm(snapshots)
+    models = opponents.connect(*sharing) if sharing else None
+    if models:
+        models.sync()
+    statistics = CompetitionStatistics()
+    latency = Latency() if latency else None
+    difference = Difference() if alternative else None
+    records = recorder.get(*recording) if recording else None
+    for index, game in enumerate(games, first):
+        telemetry.started(index)
+        if alternative is None:
+            id = recorder.key(index) if records else None
+            statistics += playGame(game, latency, deadlines, records, id).statistics
+        else:
+            a, b = playPair(game, alternative, latency, deadlines, records, index)
+            statistics += a.statistics
+            # The other bots played the same game twice, so only count it once.
+            statistics += b.statistics.select([b.bots[game[3]].name])
+            spy = game[1][game[3]]
+            difference.sample(a.resistanceWon != spy, b.resistanceWon != spy)
+        telemetry.finished()
+    if records:
+        records.flush()
+    if models:
+        models.sync(force=True)
+    return statistics, latency, len(games), time.time() - start, difference
 
 
 class CompetitionRunner(object):
 
-    def __init__(self, competitors, rounds, quiet = False):
+    # Target duration of a block of games, in seconds.  Longer blocks reduce
+    # the communication overhead, shorter blocks help balance the workers.
+    BLOCK_TIME = 0.5
+
+    # In racing mode, the number of games each bot plays before its ranking
+    # can be considered settled based on its confidence interval.
+    RACING_GAMES = 100
+
+    # Number of seconds between two updates of the progress.
+    STATUS_INTERVAL = 10.0
+
+    def __init__(self, competitors, rounds, quiet = False, checkpoint = None, interval = 60.0, racing = False,
+                 seed = None, processes = None, pool = None, configure = None, latency = False,
+                 timeout = None, budget = None, logs = 'file', balanced = False, paired = None, record = None,
+                 status = None, share = False, models = None):
         self.rounds = rounds
         self.quiet = quiet
-        self.statistics = collections.defaultdict(CompetitionStatistics)
+        self.racing = racing
+        self.processes = processes or multiprocessing.cpu_count()
+        # Optional pool of workers, e.g. a cluster.Coordinator, to use instead
+        # of creating a local multiprocessing.Pool for each competition.
+        self.pool = pool
+        # Function and arguments called in the workers before each block of
+        # games, e.g. to set class parameters in long-lived pool processes.
+        self.configure = configure
+        # Optional timings of all the calls to the bots, see latency.py.
+        self.latency = Latency() if latency else None
+        # Time allowed per call to a bot and per game, in seconds.
+        self.deadlines = Deadlines(timeout, budget) if timeout or budget else None
+        # Policy for the logs of the bots in the workers, see botlog.py.
+        self.logs = logs
+        self.statistics = CompetitionStatistics()
+
+        # Optional pair of candidate bots, which take turns in the same seat of
+        # each game against the competitors, to measure their difference.
+        assert not (paired and racing), "Paired mode does not support racing."
+        self.paired = paired
+        self.difference = Difference() if paired else None
+
+        # Folder where all the events of the games are recorded, if any.
+        self.record = record
+
+        # File where the progress is written as JSON periodically, if any.
+        self.status = status
+
+        # Whether the learner bots in all the workers share their models of
+        # the opponents, via a store that main() starts, see opponents.py.
+        self.share = share
+        self.sharing = None
+        # Folder with the snapshots that the learner bots start from, if any,
+        # which tools/training.py creates.
+        self.models = models
+
+        # Ranges of games from the schedule that are merged in the statistics,
+        # which are saved periodically to the checkpoint file if specified.
+        self.completed = []
+        self.checkpoint = checkpoint
+        self.interval = interval
 
         # Make sure there are sufficient entrants if necessary.
         # WARNING: Results in multiple bot instances per game!
@@ -129,24 +413,75 @@ class CompetitionRunner(object):
         while competitors and len(self.competitors) < 5:
             self.competitors.extend(competitors)
 
+        # Balanced schedules reduce the variance of the results for short runs.
+        self.schedule = (BalancedSchedule if balanced else Schedule)(self.competitors, self.rounds, seed)
+
     def listGameSelections(self):
         """Evaluate all bots in all possible permutations!  If there are more
-        games requested, randomly fill up from a next round of permutations."""
-        if not self.competitors: raise StopIteration 
-
-        p = []
-        r = set(itertools.permutations([True, True, False, False, False]))
-        for players in itertools.permutations(self.competitors, 5):
-            for roles in r:
-                p.append((players, roles))
-
-        permutations = []
-        while len(permutations) < self.rounds:
-            random.shuffle(p)
-            permutations.extend(p)
-        
-        for players, roles in permutations[:self.rounds]:
-            yield (players, roles)
+        games requested, randomly fill up from a next round of permutations.
+        The games are generated lazily, see the Schedule class for details."""
+        return iter(self.schedule)
+
+    def game(self, index):
+        """Lookup the game at the given position in the schedule, including the
+        seed for its random number generator."""
+        players, roles = self.schedule[index]
+        return players, roles, self.schedule.gameSeed(index)
+
+    def recorded(self):
+        """Names of all the bots that may be recorded, in the order of their
+        ids in the records."""
+        names = []
+        for bot in list(self.competitors) + list(self.paired or []):
+            if bot.__name__ not in names:
+                names.append(bot.__name__)
+        return names
+
+    def pair(self, index):
+        """Lookup the game at the given position in the schedule for paired
+        mode, with the first candidate in a seat that rotates every game."""
+        players, roles, seed = self.game(index)
+        seat = index % len(players)
+        return players[:seat] + (self.paired[0],) + players[seat+1:], roles, seed, seat
+
+    def rerun(self, index):
+        """Play a single game from the schedule again, e.g. to investigate a
+        suspicious result, and return the completed game.  The outcome is the
+        same as in the full competition, unless bots learn across games."""
+        if self.models:
+            opponents.warm(self.models)
+        return playGame(self.game(index), deadlines=self.deadlines)
+
+    def contenders(self):
+        """List the names of the bots whose ranking is not settled yet, because
+        their confidence interval overlaps with that of another bot, or they
+        have played fewer than RACING_GAMES.  Racing mode only schedules more
+        games for these bots, until every one of them has played enough."""
+        intervals = self.statistics.intervals()
+        result = []
+        for name in set([bot.__name__ for bot in self.competitors]):
+            if name not in self.statistics or self.statistics[name].total().samples < self.RACING_GAMES:
+                result.append(name)
+                continue
+            value, error = intervals[name]
+            if any([abs(value - v) < error + e for n, (v, e) in intervals.items() if n != name]):
+                result.append(name)
+        return result
+
+    def race(self, contenders, start, stop):
+        """Generate tables for racing mode, which seat the contenders first and
+        fill up the remaining seats with other bots.  The tables depend on the
+        results so far, so they are only reproducible with a single process."""
+        rng = random.Random(self.schedule.gameSeed(-1 - start))
+        bots = [b for b in self.competitors if b.__name__ in contenders]
+        for i in range(start, stop):
+            table = rng.sample(bots, min(5, len(bots)))
+            others = [b for b in self.competitors if b not in table]
+            table += rng.sample(others, min(5 - len(table), len(others)))
+            while len(table) < 5:
+                table.append(rng.choice(self.competitors))
+            rng.shuffle(table)
+            yield tuple(table), rng.choice(ROLES), self.schedule.gameSeed(i)
 
     def main(self):
         names = [bot.__name__ for bot in self.competitors]
@@ -155,31 +490,211 @@ class CompetitionRunner(object):
                 bot.onCompetitionStarting(names)
 
         if not self.quiet:
-            print("Running competition with %i bots." % (len(self.competitors)), file=sys.stderr)
-
-        def output(text):
-            sys.stdout.write(text)
-            sys.stdout.flush()
-
-        pool = multiprocessing.Pool(multiprocessing.cpu_count(), setup)
-        # pool = itertools
-        for i, stats in enumerate(pool.imap(play, self.listGameSelections())):
-            for p, s in stats.items():
-                self.statistics[p] += s
-
-            if not self.quiet:
-                if (i+1) % 500 == 0:  output('(%02i%%)\n' % (100*(i+1)/self.rounds))
-                elif (i+1) % 125 == 0: output('O')
-                elif (i+1) %  25 == 0: output('o')
-                elif (i+1) %  5 == 0: output('.')
+            print("Running competition with %i bots, seed %i." % (len(self.competitors), self.schedule.seed), file=sys.stderr)
+        if self.record:
+            recorder.manifest(self.record, self.recorded(), seed=self.schedule.seed, schedule=self.schedule.__class__.__name__)
+
+        processes = self.processes
+        done = sum([stop - start for start, stop in self.completed])
+        progress = None
+        if not self.quiet or self.status:
+            progress = telemetry.Telemetry(processes or multiprocessing.cpu_count(), done, self.status,
+                                           self.STATUS_INTERVAL, None if self.quiet else sys.stderr)
+
+        if self.models:
+            opponents.warm(self.models)
+        store = opponents.Store() if self.share else None
+        self.sharing = (store.address, store.authkey) if store else None
+
+        sink = LogSink() if self.logs == 'collected' and not self.pool else None
+        shared = progress.shared if progress else None
+        pool = self.pool or multiprocessing.Pool(processes, setup, (self.logs, sink and sink.queue, shared, botlog.folder))
+        self.dispatched = 0
+        # Token that tells the workers when a new competition starts.
+        self.run = os.urandom(8)
+        try:
+            for count in self.execute(pool, processes):
+                done += count
+                if progress:
+                    progress.update(done, self.rounds, self.dispatched)
+            if progress:
+                progress.update(done, self.rounds, self.dispatched, force=True)
+            if pool is not self.pool:
+                # Let the workers exit normally so their pending logs are sent.
+                pool.close()
+                pool.join()
+            if store:
+                # The bots of this process get the models merged from all the
+                # workers, e.g. for onCompetitionFinished() and rerun().
+                opponents.connect(*self.sharing).sync(force=True)
+        finally:
+            if pool is not self.pool:
+                pool.terminate()
+            if store:
+                store.shutdown()
+                self.sharing = None
+            if sink:
+                sink.close()
+            if self.checkpoint:
+                self.save(self.checkpoint)
+
+    def save(self, filename):
+        """Store the aggregated statistics and the ranges of the schedule that
+        were completed, so the competition can be resumed later.  The file is
+        replaced atomically so it's never left incomplete."""
+        data = {
+            'competitors': [bot.__name__ for bot in self.competitors],
+            'seed': self.schedule.seed,
+            'schedule': self.schedule.__class__.__name__,
+            'completed': self.completed,
+            'names': self.statistics.names,
+            'statistics': list(self.statistics.data),
+        }
+        if self.paired:
+            data['paired'] = [bot.__name__ for bot in self.paired]
+            data['difference'] = [self.difference.better, self.difference.worse, self.difference.samples]
+        temporary = filename + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(temporary, filename)
+
+    def resume(self, filename):
+        """Restore the state of a competition from a checkpoint file, so the
+        games that were already played are skipped by main()."""
+        with open(filename) as f:
+            data = json.load(f)
+        names = [bot.__name__ for bot in self.competitors]
+        assert data['competitors'] == names, "The competitors %r do not match the checkpoint %r." % (names, data['competitors'])
+        schedule = self.schedule.__class__
+        assert data.get('schedule', 'Schedule') == schedule.__name__, "The checkpoint was not created with a %s." % (schedule.__name__)
+        paired = [bot.__name__ for bot in self.paired] if self.paired else None
+        assert data.get('paired') == paired, "The paired candidates %r do not match the checkpoint %r." % (paired, data.get('paired'))
+
+        self.schedule = schedule(self.competitors, self.rounds, data['seed'])
+        self.completed = [tuple(r) for r in data['completed']]
+        self.statistics = CompetitionStatistics(data['names'])
+        self.statistics.data = array.array('d', data['statistics'])
+        if self.paired:
+            self.difference = Difference(*data['difference'])
+
+    def complete(self, start, stop):
+        """Mark a range of games as completed, merging it with the others."""
+        ranges = sorted(self.completed + [(start, stop)])
+        self.completed = ranges[:1]
+        for a, b in ranges[1:]:
+            if a <= self.completed[-1][1]:
+                self.completed[-1] = (self.completed[-1][0], max(b, self.completed[-1][1]))
+            else:
+                self.completed.append((a, b))
+
+    def unfinished(self):
+        """List the ranges of games in the schedule that still need playing."""
+        ranges, start = [], 0
+        for a, b in self.completed + [(self.rounds, self.rounds)]:
+            if start < min(a, self.rounds):
+                ranges.append((start, min(a, self.rounds)))
+            start = max(start, b)
+        return ranges
+
+    def blockSize(self, cost, processes, remaining):
+        """Pick the number of games to send to a worker at once, so that each
+        block takes roughly BLOCK_TIME given the measured cost per game.  The
+        blocks get smaller towards the end to keep all the workers busy."""
+        if cost is None:
+            return 1
+        size = int(self.BLOCK_TIME / max(cost, 1e-6))
+        return max(1, min(size, remaining // (2 * processes)))
+
+    def execute(self, pool, processes):
+        """Run all the scheduled games in blocks on the pool, merging the
+        statistics returned and yielding the number of games completed."""
+        gaps = self.unfinished()
+        results = queue.Queue()
+        pending, inflight, cost = [], 0, None
+        remaining = sum([stop - start for start, stop in gaps])
+        saved = time.time()
+
+        while True:
+            # Keep two blocks per worker in flight so none of them wait.
+            while inflight < processes * 2 and gaps:
+                if self.racing:
+                    contenders = self.contenders()
+                    # A bot may be left alone before it played enough games for
+                    # its ranking to be measured, so keep racing it until then.
+                    unplayed = [n for n in contenders if n not in self.statistics
+                                or self.statistics[n].total().samples < self.RACING_GAMES]
+                    if len(contenders) < 2 and not unplayed:
+                        if not self.quiet:
+                            done = sum([stop - start for start, stop in self.completed])
+                            print("\nRankings settled after %i games." % (done), file=sys.stderr)
+                        gaps = []
+                        break
+
+                start, stop = gaps[0]
+                end = min(stop, start + self.blockSize(cost, processes, remaining))
+                if end == stop:
+                    gaps.pop(0)
+                else:
+                    gaps[0] = (end, stop)
+                remaining -= end - start
+
+                if self.racing:
+                    block = list(self.race(contenders, start, end))
+                elif self.paired:
+                    block = [self.pair(i) for i in range(start, end)]
+                else:
+                    block = [self.game(i) for i in range(start, end)]
+                alternative = self.paired[1] if self.paired else None
+                recording = (self.record, self.recorded()) if self.record else None
+                callback = lambda result, start=start, end=end: results.put((start, end, result))
+                pending.append(pool.apply_async(playBlock, (block, self.configure, bool(self.latency), self.deadlines,
+                                                            alternative, recording, start, self.sharing, self.models,
+                                                            self.run),
+                                                callback=callback))
+                inflight += 1
+                self.dispatched += end - start
+            if not inflight:
+                break
+
+            try:
+                result = results.get(timeout=1.0)
+            except queue.Empty:
+                result = None
+            # Callbacks are not called for failures, so check explicitly before
+            # forgetting the blocks that are done, or they'd stay in flight.
+            for r in pending:
+                if r.ready() and not r.successful():
+                    r.get()
+            pending = [r for r in pending if not r.ready()]
+            if result is None:
+                yield 0
+                continue
+            start, end, (stats, latency, count, elapsed, difference) = result
+            inflight -= 1
+
+            self.statistics += stats
+            if latency:
+                self.latency += latency
+            if difference:
+                self.difference += difference
+            self.complete(start, end)
+            if self.checkpoint and time.time() - saved > self.interval:
+                self.save(self.checkpoint)
+                saved = time.time()
+
+            # Track the cost per game as a moving average, for block sizes.
+            sample = elapsed / count
+            cost = sample if cost is None else 0.8 * cost + 0.2 * sample
+            yield count
 
     def echo(self, *args):
         print(' '.join([str(a) for a in args]))
 
     def score(self, name):
-        return (self.statistics[name].spyWins.estimate(),
-                self.statistics[name].resWins.estimate(),
-                self.statistics[name].total())
+        s = self.statistics[name]
+        return (s.spyWins.estimate(), s.resWins.estimate(), s.total())
 
     def rank(self, name):
         results = sorted(self.statistics.items(), key = lambda x: x[1].total().estimate(), reverse=True)
@@ -189,12 +704,17 @@ class CompetitionRunner(object):
         return None
 
     def last(self):
-        results = sorted(self.statistics, key=lambda x: self.statistics[x].total().estimate(), reverse=True)
+        results = sorted(self.statistics.names, key=lambda x: self.statistics[x].total().estimate(), reverse=True)
         bot = [c for c in self.competitors if c.__name__ == results[-1]][0]
         other = [c for c in self.competitors if c.__name__ == results[-2]][0]
         return (bot, self.statistics[results[-1]].total()),                  \
                (other, self.statistics[results[-2]].total())
 
+    def balance(self):
+        """Measure how balanced the games played so far were for each bot, see
+        schedule.balance().  This is not available in racing mode."""
+        return balance(self.schedule[i] for start, stop in self.completed for i in range(start, stop))
+
     def show(self, summary = False):
         print("")
         for bot in self.competitors:
@@ -218,6 +738,29 @@ class CompetitionRunner(object):
             self.echo(" ", '{0:<16s}'.format(s[0]), s[1].total().detail())
         self.echo("")
 
+        forfeits = [(name, s.forfeits.total) for name, s in self.statistics.items() if s.forfeits.total]
+        if forfeits:
+            self.echo("FORFEITS")
+            for name, count in sorted(forfeits, key = lambda x: x[1], reverse = True):
+                self.echo(" ", '{0:<16s}'.format(name), int(count))
+            self.echo("")
+
+        if self.paired and self.difference.samples:
+            first, second = [self.statistics[bot.__name__].total() for bot in self.paired]
+            self.echo("PAIRED\t\t\t\t(difference,\t unpaired error)")
+            self.echo(" ", '{0:<16s}'.format("%s - %s" % tuple(bot.__name__ for bot in self.paired)),
+                      self.difference.detail(), "\t e=%4.2f" % (math.sqrt(first.error() ** 2 + second.error() ** 2) * 100))
+            self.echo("")
+
+        if isinstance(self.schedule, BalancedSchedule) and not self.racing and not summary:
+            self.echo("BALANCE\t\t\t\t(games,\t spy,\t\t seats,\t opponents)")
+            for name, (games, spy, seats, opponents) in sorted(self.balance().items()):
+                self.echo(" ", '{0:<16s}'.format(name), "%8i\t %5.1f%%\t\t %.2f\t %.2f" % (games, spy * 100.0, seats, opponents))
+            self.echo("")
+
+        if self.latency and not summary:
+            self.latency.show()
+
 
 def getCompetitors(argv):
     competitors = []
@@ -247,15 +790,108 @@ def getCompetitors(argv):
     return competitors
 
 if __name__ == '__main__':
-    if len(sys.argv) <= 2:
-        print('USAGE: competition.py 10000 (filename|module.BotName) [...]')
+    import argparse
+
+    parser = argparse.ArgumentParser(usage='competition.py 10000 (filename|module.BotName) [...]')
+    parser.add_argument('rounds', type=int, nargs='?',
+                help = "Total number of games to play in the competition.")
+    parser.add_argument('--checkpoint', type=str, required=False, default=None,
+                help = "File where the progress of the competition is saved periodically.")
+    parser.add_argument('--interval', type=float, required=False, default=60.0,
+                help = "Number of seconds between two checkpoints.")
+    parser.add_argument('--resume', action='store_true',
+                help = "Continue the competition from the checkpoint file if it exists.")
+    parser.add_argument('--racing', action='store_true',
+                help = "Stop playing games once the rankings are statistically settled.")
+    parser.add_argument('--balanced', action='store_true',
+                help = "Schedule games in blocks where all bots play every seat and role equally.")
+    parser.add_argument('--paired', type=str, nargs=2, required=False, default=None, metavar=('A', 'B'),
+                help = "Compare two bots, playing each game against the competitors once with each.")
+    parser.add_argument('--seed', type=int, required=False, default=None,
+                help = "Seed for the schedule and the games, to reproduce a competition.")
+    parser.add_argument('--processes', type=int, required=False, default=None,
+                help = "Number of worker processes, by default one per core.")
+    parser.add_argument('--latency', action='store_true',
+                help = "Measure the time spent in each bot and API call.")
+    parser.add_argument('--timeout', type=float, required=False, default=None,
+                help = "Seconds allowed for each call to a bot, or it forfeits the game.")
+    parser.add_argument('--budget', type=float, required=False, default=None,
+                help = "Seconds allowed for all the calls to each bot in a game.")
+    parser.add_argument('--logs', choices=botlog.POLICIES, default='file',
+                help = "Write the logs of the bots from each process, not at all, or from a single process.")
+    parser.add_argument('--record', type=str, required=False, default=None,
+                help = "Folder where all the events of the games are stored, for later analysis.")
+    parser.add_argument('--status', type=str, required=False, default=None,
+                help = "File where the progress and the state of the workers is written as JSON.")
+    parser.add_argument('--share', action='store_true',
+                help = "Merge what the learner bots know about their opponents across all the workers.")
+    parser.add_argument('--models', type=str, required=False, default=None,
+                help = "Folder with snapshots of the opponent models that the learner bots start from.")
+    parser.add_argument('--game', type=int, required=False, default=None,
+                help = "Replay only the game with this index from the schedule.")
+    parser.add_argument('--listen', type=str, required=False, default=None,
+                help = "Address like 0.0.0.0:7777 for remote workers to connect to.")
+    parser.add_argument('--worker', type=str, required=False, default=None,
+                help = "Run as a remote worker for the coordinator at this address.")
+    parser.add_argument('--authkey', type=str, required=False, default=None,
+                help = "Shared secret used by the coordinator and its workers.")
+    args, remaining = parser.parse_known_args()
+
+    import cluster
+    authkey = args.authkey.encode('utf-8') if args.authkey else cluster.AUTHKEY
+    for address in [args.listen, args.worker]:
+        if address and not args.authkey and not cluster.isLoopback(cluster.parseAddress(address)):
+            parser.error("Connections across the network require a secret --authkey.")
+    if args.worker:
+        try:
+            cluster.work(cluster.parseAddress(args.worker), authkey)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    if not remaining or args.rounds is None:
+        parser.print_usage()
         sys.exit(-1)
-
-    competitors = getCompetitors(sys.argv[2:])
-    runner = CompetitionRunner(competitors, int(sys.argv[1]))
+    if args.resume and not args.checkpoint:
+        parser.error("Resuming requires a --checkpoint file.")
+
+    competitors = getCompetitors(remaining)
+    paired = None
+    if args.paired:
+        paired = tuple(getCompetitors([p]) for p in args.paired)
+        if any(len(p) != 1 for p in paired):
+            parser.error("Each of the --paired candidates must be a single bot, like module.BotName.")
+        paired = tuple(p[0] for p in paired)
+        if args.racing:
+            parser.error("Paired mode does not support --racing.")
+    if args.share and args.listen:
+        parser.error("The models of the bots can only be shared by local workers, not with --listen.")
+    pool = None
+    if args.listen:
+        # The number of processes should match the total number of workers.
+        pool = cluster.Coordinator(cluster.parseAddress(args.listen), remaining, authkey, args.logs)
+
+    runner = CompetitionRunner(competitors, args.rounds, checkpoint=args.checkpoint, interval=args.interval,
+                               racing=args.racing, seed=args.seed, processes=args.processes, pool=pool,
+                               latency=args.latency, timeout=args.timeout, budget=args.budget,
+                               logs=args.logs, balanced=args.balanced, paired=paired,
+                               record=args.record, status=args.status, share=args.share,
+                               models=args.models)
+    if args.resume and os.path.exists(args.checkpoint):
+        runner.resume(args.checkpoint)
+
+    if args.game is not None:
+        g = runner.rerun(args.game)
+        if g.forfeit:
+            print("GAME #%i %r FORFEIT %s" % (args.game, g.bots, g.forfeit))
+        else:
+            print("GAME #%i %r %s" % (args.game, g.bots, "RESISTANCE WON" if g.won else "SPIES WON"))
+        sys.exit(0)
     try:
         runner.main()
     except (KeyboardInterrupt, SystemExit):
         pass
     finally:
+        if pool:
+            pool.terminate()
         runner.show()
@@ -0,0 +1,82 @@
+import itertools
+
+# The number of spies in a game, by number of players, is shared with the engine.
+from fastgame import SPIES
+
+# Number of players in the largest game, so any set of seats fits the tables.
+SEATS = 10
+
+# Number of bits set in every mask of seats, to count the spies on a team.
+POPCOUNT = [bin(m).count('1') for m in range(1 << SEATS)]
+
+
+def mask(seats, players):
+    """Bitmask of the positions in a list of seats, e.g. Bot.others(), that
+    are taken by the given players."""
+    result = 0
+    for i, p in enumerate(seats):
+        if p in players:
+            result |= 1 << i
+    return result
+
+
+def members(seats, m):
+    """Players in a list of seats whose positions are set in the mask, in the
+    order of the seats."""
+    return [p for i, p in enumerate(seats) if m >> i & 1]
+
+
+def count(config, team):
+    """Number of assumed spies of a configuration on the team, both masks."""
+    return POPCOUNT[config & team]
+
+
+def exact(configs, team, sabotaged):
+    """Configurations where each spy on the team sabotaged the mission."""
+    return [c for c in configs if POPCOUNT[c & team] == sabotaged]
+
+
+def atLeast(configs, team, sabotaged):
+    """Configurations with enough spies on the team for the sabotages, i.e.
+    where spies may or may not have sabotaged."""
+    return [c for c in configs if POPCOUNT[c & team] >= sabotaged]
+
+
+class Space(object):
+    """All the ways to place a number of spies among a number of seats, as
+    bitmasks where bit i means the player in seat i is a spy.  The masks are
+    listed in the orders the bots used to enumerate them, so that random
+    choices and ties are resolved exactly as before:
+
+        permutations  -- list(set(itertools.permutations(...)))
+        keys          -- a dictionary built from those permutations.
+        combinations  -- itertools.combinations(range(seats), spies)
+    """
+
+    def __init__(self, seats, spies):
+        assert 0 <= spies <= seats <= SEATS, "Can't place %i spies among %i seats." % (spies, seats)
+        self.seats = seats
+        self.spies = spies
+
+        def encode(config):
+            return sum(1 << i for i, spy in enumerate(config) if spy)
+
+        configs = list(set(itertools.permutations([True] * spies + [False] * (seats - spies))))
+        self.permutations = tuple(encode(c) for c in configs)
+        self.keys = tuple(encode(c) for c in dict.fromkeys(configs))
+        self.combinations = tuple(sum(1 << i for i in c) for c in itertools.combinations(range(seats), spies))
+
+    def __len__(self):
+        return len(self.combinations)
+
+
+# Spaces built so far, by number of seats and spies, see space().
+spaces = {}
+
+
+def space(seats, spies):
+    """The configurations of spies among seats, built once per process."""
+    s = spaces.get((seats, spies))
+    if s is None:
+        s = spaces[(seats, spies)] = Space(seats, spies)
+    return s
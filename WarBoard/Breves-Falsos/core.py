@@ -6,27 +6,104 @@ class Observable(type):
     in derived classes without having to explicitly call the base class.  The
     observers of the base classes are always called before those of the
     specialized classes.
+
+    The chain of observers for each event is resolved once when a class is
+    created, into a tuple stored in `__chains__`, and each class gets its own
+    dispatch function so events cost the same regardless of the hierarchy.
+
+    Observers that also call the base class explicitly via super() would run
+    the whole chain again, so their chains are guarded against re-entrance.
     """
     def __new__(cls, name, parents, dct):
         __hooks__ = collections.defaultdict(list)
         if name != 'Bot':
-            for (k, v) in dct.items():
+            for (k, v) in list(dct.items()):
                 if not k.startswith('on'):
                     continue
                 __hooks__[k].append(v)
                 del dct[k]
             dct['__hooks__'] = __hooks__
         else:
-            for (k, v) in dct.items():
+            observed = {}
+            for (k, v) in list(dct.items()):
                 if not k.startswith('on'):
                     continue
-                def bind(name=k, function=v):
-                    def wrap(self, *args, **kwargs):
-                        for c in reversed(self.__class__.__mro__):                            
-                            if hasattr(c, '__hooks__'):
-                                for m in c.__hooks__.get(name, []):
-                                    m(self, *args, **kwargs)
-                        return function(self, *args, **kwargs)
-                    return wrap
-                dct[k] = bind()
-        return super(Observable, cls).__new__(cls, name, parents, dct)
+                observed[k] = v
+                dct[k] = cls.dispatcher(None, k, (), v)
+            dct['__observed__'] = observed
+            dct['__dispatchers__'] = frozenset(observed)
+            dct['__chains__'] = dict((k, ()) for k in observed)
+
+        klass = super(Observable, cls).__new__(cls, name, parents, dct)
+        if name != 'Bot' and hasattr(klass, '__observed__'):
+            cls.resolve(klass)
+        return klass
+
+    @classmethod
+    def resolve(cls, klass):
+        """Compute the chains of observers for a new class, then install the
+        functions that are called for each event."""
+        klass.__chains__ = {}
+        dispatchers = set()
+        for name, function in klass.__observed__.items():
+            chain = []
+            for c in reversed(klass.__mro__):
+                chain.extend(c.__dict__.get('__hooks__', {}).get(name, []))
+            if any('super' in getattr(m, '__code__', m).co_names for m in chain):
+                chain = [cls.guarded(name, tuple(chain))]
+            klass.__chains__[name] = tuple(chain)
+
+            # Functions of other base classes, e.g. mix-ins that don't derive
+            # from Bot, take precedence over the dispatchers as they would in
+            # the method resolution order.
+            for c in klass.__mro__[1:]:
+                if name in c.__dict__ and name not in c.__dict__.get('__dispatchers__', ()):
+                    setattr(klass, name, c.__dict__[name])
+                    break
+            else:
+                setattr(klass, name, cls.dispatcher(klass, name, klass.__chains__[name], function))
+                dispatchers.add(name)
+        klass.__dispatchers__ = frozenset(dispatchers)
+
+    @staticmethod
+    def guarded(name, chain):
+        """Call a chain of observers unless it's already running for the same
+        instance and event, i.e. from an observer of that chain."""
+        def observe(self, *args, **kwargs):
+            active = self.__dict__.setdefault('__observing__', set())
+            if name in active:
+                return
+            active.add(name)
+            try:
+                for m in chain:
+                    m(self, *args, **kwargs)
+            finally:
+                active.discard(name)
+        return observe
+
+    @staticmethod
+    def dispatcher(klass, name, chain, function):
+        """Call all the observers of an event then the base function.  When the
+        dispatcher is reached for an instance of a derived class, e.g. with
+        super(), the observers of the actual class are called instead."""
+        def dispatch(self, *args, **kwargs):
+            for m in (chain if self.__class__ is klass else self.__class__.__chains__[name]):
+                m(self, *args, **kwargs)
+            return function(self, *args, **kwargs)
+        dispatch.__name__ = name
+        dispatch.__doc__ = function.__doc__
+        return dispatch
+
+
+def overrides(klass, name, base):
+    """Check if calling a function of this class does more than calling the
+    function of the base class, which is assumed to do nothing.  Observers
+    are taken into account for classes created by the Observable meta-class."""
+    for c in klass.__mro__:
+        if name in c.__dict__:
+            break
+    else:
+        return False
+    if c is base or name in c.__dict__.get('__dispatchers__', ()):
+        return bool(getattr(klass, '__chains__', {}).get(name))
+    return True
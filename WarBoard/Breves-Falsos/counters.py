@@ -0,0 +1,332 @@
+import hashlib
+import struct
+import mmap
+import ast
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from util import Variable
+
+
+# Each counter is identified by a hash of its key, and stores a total and a
+# number of samples.  The same record is used in the log and in the table.
+RECORD = struct.Struct('<Qdd')
+
+# Header of the table: magic, format, number of slots, number of counters and
+# the last segment of the log that was compacted into it.
+HEADER = struct.Struct('<4sIQQQ')
+MAGIC = b'CNT1'
+FORMAT = 1
+
+
+def digest(key):
+    """Stable 64-bit hash of a key made of tuples, strings, numbers, booleans
+    and None, the same in all processes and versions of Python.  Zero is used
+    for the empty slots of the table."""
+    return struct.unpack('<Q', hashlib.md5(repr(key).encode('utf-8')).digest()[:8])[0] or 1
+
+
+class Table(object):
+    """Read-only hash table of counters in a file, which is memory-mapped so
+    opening it costs the same regardless of its size.  The slots are probed
+    linearly from the hash, and the table is never more than half full."""
+
+    def __init__(self, filename):
+        self.capacity, self.count, self.absorbed = 0, 0, 0
+        self.data = None
+        if not os.path.exists(filename) or os.path.getsize(filename) < HEADER.size:
+            return
+        with open(filename, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, format, self.capacity, self.count, self.absorbed = HEADER.unpack_from(self.data, 0)
+        assert magic == MAGIC and format == FORMAT, "%s is not a table of counters in format %i." % (filename, FORMAT)
+
+    def __len__(self):
+        return self.count
+
+    def get(self, h):
+        """Total and samples of a counter by hash, or None if it's not there."""
+        if not self.capacity:
+            return None
+        i = h & (self.capacity - 1)
+        while True:
+            key, total, samples = RECORD.unpack_from(self.data, HEADER.size + i * RECORD.size)
+            if key == h:
+                return total, samples
+            if key == 0:
+                return None
+            i = (i + 1) & (self.capacity - 1)
+
+    def items(self):
+        for i in range(self.capacity):
+            key, total, samples = RECORD.unpack_from(self.data, HEADER.size + i * RECORD.size)
+            if key:
+                yield key, (total, samples)
+
+    @staticmethod
+    def write(filename, counters, absorbed):
+        """Create a table from a dictionary of (total, samples) by hash, then
+        replace the file atomically so readers see either version."""
+        capacity = 16
+        while capacity < 2 * len(counters):
+            capacity *= 2
+        data = bytearray(HEADER.size + capacity * RECORD.size)
+        HEADER.pack_into(data, 0, MAGIC, FORMAT, capacity, len(counters), absorbed)
+        for h, (total, samples) in counters.items():
+            i = h & (capacity - 1)
+            while RECORD.unpack_from(data, HEADER.size + i * RECORD.size)[0]:
+                i = (i + 1) & (capacity - 1)
+            RECORD.pack_into(data, HEADER.size + i * RECORD.size, h, total, samples)
+
+        temporary = filename + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(temporary, filename)
+
+
+class Lock(object):
+    """Advisory lock on a file shared by all the processes using a database,
+    which does nothing on platforms without fcntl."""
+
+    def __init__(self, filename, exclusive=True, blocking=True):
+        self.filename = filename
+        self.flags = 0
+        if fcntl:
+            self.flags = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB)
+
+    def __enter__(self):
+        self.file = open(self.filename, 'a')
+        if fcntl:
+            try:
+                fcntl.flock(self.file.fileno(), self.flags)
+            except IOError:
+                self.file.close()
+                return False
+        return True
+
+    def __exit__(self, *args):
+        self.file.close()
+
+
+class Database(object):
+    """Persistent counters in a folder, which many processes can update at
+    the same time.  Increments are buffered in memory, then appended to a log
+    by flush().  Once the log is large enough, it's compacted into the table,
+    so opening the database only needs to replay a log of bounded size.
+
+    The log is renamed into a numbered segment before it's compacted, and the
+    table records the last segment it includes, so a crash at any point never
+    loses or counts twice any increments that were flushed."""
+
+    # Size of the log in records before it's compacted.
+    COMPACT = 1 << 16
+
+    def __init__(self, folder):
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        self.folder = folder
+        self.buffer = []
+        self.names = []
+        self.known = set()
+        self.decoded = None
+
+        # Increments that were flushed but not compacted yet.  The table, the
+        # segments and the log are read while no compaction can move them.
+        self.pending = {}
+        with Lock(self.path('compacting'), exclusive=False):
+            self.table = Table(self.path('table'))
+            for _, filename in self.segments():
+                self.replay(filename)
+            self.replay(self.path('log'))
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def segments(self, after=None):
+        """List the segments of the log that the table doesn't include, or all
+        of them with a negative number."""
+        after = self.table.absorbed if after is None else after
+        result = []
+        for filename in os.listdir(self.folder):
+            name, _, seq = filename.partition('.')
+            if name == 'log' and seq.isdigit() and int(seq) > after:
+                result.append((int(seq), self.path(filename)))
+        return sorted(result)
+
+    def replay(self, filename, counters=None):
+        counters = self.pending if counters is None else counters
+        if not os.path.exists(filename):
+            return
+        with open(filename, 'rb') as f:
+            data = f.read()
+        # A torn record at the end is ignored, see flush().
+        for i in range(0, len(data) - len(data) % RECORD.size, RECORD.size):
+            h, total, samples = RECORD.unpack_from(data, i)
+            t, s = counters.get(h, (0.0, 0))
+            counters[h] = (t + total, s + samples)
+
+    def get(self, h):
+        """Total and samples of the counter with the given hash."""
+        total, samples = self.table.get(h) or (0.0, 0)
+        t, s = self.pending.get(h, (0.0, 0))
+        return total + t, samples + s
+
+    def __contains__(self, h):
+        return h in self.pending or self.table.get(h) is not None
+
+    def add(self, h, key, total, samples=1):
+        """Buffer an increment, with the key of the counter if it's new so it
+        can be iterated on later."""
+        if key is not None and h not in self.known and h not in self:
+            self.known.add(h)
+            self.names.append((h, key))
+        self.buffer.append(RECORD.pack(h, total, samples))
+
+    def flush(self):
+        """Append the buffered increments to the log, and compact it if it has
+        grown too large.  Each batch is written at once while holding the lock,
+        after removing any record torn by a process that crashed."""
+        if not self.buffer and not self.names:
+            return
+        with Lock(self.path('lock')):
+            if self.names:
+                filename = self.path('keys')
+                torn = os.path.exists(filename) and os.path.getsize(filename) and not self.endsWithNewline(filename)
+                with open(filename, 'a') as f:
+                    if torn:
+                        f.write('\n')
+                    f.write(''.join('%016x %r\n' % (h, key) for h, key in self.names))
+            fd = os.open(self.path('log'), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+            try:
+                size = os.fstat(fd).st_size
+                if size % RECORD.size:
+                    os.ftruncate(fd, size - size % RECORD.size)
+                os.write(fd, b''.join(self.buffer))
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        self.buffer, self.names = [], []
+        if size >= self.COMPACT * RECORD.size:
+            self.compact()
+
+    def endsWithNewline(self, filename):
+        with open(filename, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def compact(self):
+        """Merge the log into a new version of the table.  Only one process
+        compacts at a time, and not while a database is being opened, but the
+        others carry on appending to a new log."""
+        with Lock(self.path('compacting'), blocking=False) as locked:
+            if not locked:
+                return False
+            table = Table(self.path('table'))
+            segments = self.segments(table.absorbed)
+            with Lock(self.path('lock')):
+                if os.path.exists(self.path('log')):
+                    seq = max([table.absorbed] + [s for s, _ in segments]) + 1
+                    os.rename(self.path('log'), self.path('log.%i' % seq))
+                    segments.append((seq, self.path('log.%i' % seq)))
+            if segments:
+                counters = dict(table.items())
+                for _, filename in segments:
+                    self.replay(filename, counters)
+                Table.write(self.path('table'), counters, segments[-1][0])
+
+            # Including the segments left by a crash after the last compaction.
+            absorbed = segments[-1][0] if segments else table.absorbed
+            for seq, filename in self.segments(-1):
+                if seq <= absorbed:
+                    os.remove(filename)
+        return bool(segments)
+
+    def keys(self):
+        """All the keys that were added, by hash, read once from the file."""
+        if self.decoded is None:
+            self.decoded = {}
+            filename = self.path('keys')
+            if os.path.exists(filename):
+                with open(filename) as f:
+                    for line in f:
+                        try:
+                            h, key = line.split(' ', 1)
+                            self.decoded[int(h, 16)] = ast.literal_eval(key)
+                        except (ValueError, SyntaxError):
+                            continue
+        return self.decoded
+
+
+class Counter(Variable):
+    """Variable whose samples are also added to a database."""
+
+    def __init__(self, database, h, key, total=0.0, samples=0):
+        super(Counter, self).__init__(total, samples)
+        self.database = database
+        self.h = h
+        self.key = key
+
+    def sample(self, value):
+        super(Counter, self).sample(value)
+        self.database.add(self.h, self.key, value)
+
+
+class Counters(dict):
+    """Dictionary of Variables stored in a database, under a prefix that's
+    added to their keys.  The variables are loaded when they are first used,
+    and like in a defaultdict they are created if they don't exist.
+
+    Each variable is a snapshot of the database when it was first used, plus
+    the samples added through it.  Increments that other writers flush later
+    are not read again, even after a compaction, until a new Database is
+    opened, e.g. in a new process."""
+
+    def __init__(self, database, prefix):
+        super(Counters, self).__init__()
+        self.database = database
+        self.prefix = prefix
+        self.complete = False
+
+    def __missing__(self, key):
+        full = (self.prefix, key)
+        h = digest(full)
+        total, samples = self.database.get(h)
+        v = self[key] = Counter(self.database, h, full, total, int(samples))
+        return v
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or digest((self.prefix, key)) in self.database
+
+    def load(self):
+        """Load all the variables stored under this prefix, to iterate."""
+        if not self.complete:
+            for h, (prefix, key) in self.database.keys().items():
+                if prefix == self.prefix and not dict.__contains__(self, key):
+                    self[key]
+            self.complete = True
+
+    def __iter__(self):
+        self.load()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self.load()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.load()
+        return dict.keys(self)
+
+    def values(self):
+        self.load()
+        return dict.values(self)
+
+    def items(self):
+        self.load()
+        return dict.items(self)
@@ -0,0 +1,95 @@
+import signal
+
+from latency import METHODS, timer
+
+
+class Timeout(BaseException):
+    """Raised within a bot that exceeded its time budget.  This derives from
+    BaseException so it isn't swallowed by bots catching all exceptions."""
+
+    def __init__(self, bot, method):
+        super(Timeout, self).__init__("%s took too long in %s()." % (bot.name, method))
+        self.bot = bot
+        self.method = method
+
+
+class Deadlines(object):
+    """Time budgets for offline games, per call to the bot API and for all the
+    calls to a bot in a game.  The budgets are enforced with an interval
+    timer, so this is only supported on platforms with signal.setitimer(), and
+    only from the main thread of a process, like the workers of a
+    multiprocessing.Pool."""
+
+    # Delay between repeated alarms, in case the bot ignored the first one.
+    RETRY = 0.1
+
+    # Modules that can't be interrupted safely, since an exception raised
+    # there may leave a lock acquired.  The alarm is repeated until later.
+    UNSAFE = ('threading', 'logging')
+
+    def __init__(self, call=None, game=None):
+        assert hasattr(signal, 'setitimer'), "Deadlines require signal.setitimer(), not available on this platform."
+        self.call = call
+        self.game = game
+
+    def instrument(self, game):
+        """Enforce the budgets on all the API calls made to the bots of this
+        game from now on.  Each bot's budget for the game only counts the time
+        spent in its own calls."""
+        spent = [0.0] * len(game.bots)
+        current, expired = [], []
+
+        def alarm(signum, frame):
+            if not expired:
+                expired.append(current[-1])
+            while frame is not None:
+                if frame.f_globals.get('__name__', '').split('.')[0] in self.UNSAFE:
+                    return
+                frame = frame.f_back
+            raise Timeout(*expired[0])
+
+        def limited(bot, name, method):
+            def wrapper(*args, **kwargs):
+                limits = [self.call]
+                if self.game is not None:
+                    limits.append(self.game - spent[bot.index])
+                limit = min(l for l in limits if l is not None)
+                if limit <= 0.0:
+                    raise Timeout(bot, name)
+
+                # Calls nested within another call to the same bot are already
+                # included in the time of the enclosing call.
+                nested = any(b is bot for b, _ in current)
+                depth = len(current)
+                previous = signal.getsignal(signal.SIGALRM)
+                outer, interval = signal.getitimer(signal.ITIMER_REAL)
+                entered = timer()
+                # The timer is armed within the try block, as a short limit may
+                # expire before the call even starts.
+                try:
+                    current.append((bot, name))
+                    signal.signal(signal.SIGALRM, alarm)
+                    # When a bot calls its own API, the enclosing call's
+                    # deadline can't be extended, and it's restored afterwards.
+                    signal.setitimer(signal.ITIMER_REAL, min(outer, limit) if outer > 0.0 else limit, self.RETRY)
+                    result = method(*args, **kwargs)
+                finally:
+                    if not nested:
+                        spent[bot.index] += timer() - entered
+                    if outer > 0.0:
+                        signal.setitimer(signal.ITIMER_REAL, max(outer - (timer() - entered), 1e-6), interval)
+                    else:
+                        signal.setitimer(signal.ITIMER_REAL, 0.0)
+                    signal.signal(signal.SIGALRM, previous or signal.SIG_DFL)
+                    del current[depth:]
+                # The alarm was deferred, or the bot caught the exception.
+                if expired:
+                    raise Timeout(*expired[0])
+                return result
+            return wrapper
+
+        if self.call is None and self.game is None:
+            return
+        for bot in game.bots:
+            for name in METHODS:
+                setattr(bot, name, limited(bot, name, getattr(bot, name)))
@@ -0,0 +1,203 @@
+from player import Player
+from game import State, implemented, HOOKS
+
+
+# Number of players sent on each of the five missions, by size of the table.
+PARTICIPANTS = {
+    5:  [2, 3, 2, 3, 3],
+    6:  [2, 3, 4, 3, 4],
+    7:  [2, 3, 3, 4, 4],
+    8:  [3, 4, 4, 5, 5],
+    9:  [3, 4, 4, 5, 5],
+    10: [3, 4, 4, 5, 5],
+}
+
+# Number of spies, by size of the table.
+SPIES = {5: 2, 6: 2, 7: 3, 8: 3, 9: 3, 10: 4}
+
+# Number of sabotages required to fail each mission, where the fourth mission
+# requires two sabotages with seven players or more.
+FAILS = dict((n, [1, 1, 1, 2 if n >= 7 else 1, 1]) for n in PARTICIPANTS)
+
+MAX_PLAYERS = 10
+
+# Seats that are set in every possible bitmask, and their number.
+SEATS = [tuple(i for i in range(MAX_PLAYERS) if m & (1 << i)) for m in range(1 << MAX_PLAYERS)]
+COUNT = [len(s) for s in SEATS]
+
+
+def bitmask(players):
+    """Convert a sequence of players into a bitmask of their seats."""
+    m = 0
+    for p in players:
+        m |= 1 << p.index
+    return m
+
+
+class FastGame(object):
+    """Alternative implementation of the game for tables of 5 to 10 players,
+    which represents teams, votes and spies internally as bitmasks over the
+    seats.  The bots use the same API and State as with the Game class, and
+    the same players are passed to all the bots rather than copies.
+
+    Subclasses can track statistics via onPlayerSelected() and onPlayerVoted()
+    like with Game, except the team is passed as a bitmask."""
+
+    MAX_TURNS = 5
+    MAX_TRIES = 5
+    NUM_WINS = 3
+    NUM_LOSSES = 3
+
+    def __init__(self, bots, roles, state=None):
+        count = len(bots)
+        assert count in PARTICIPANTS, "Tables of %i players are not supported." % (count)
+        assert sum(roles) == SPIES[count], "Expecting %i spies for %i players." % (SPIES[count], count)
+
+        self.state = state or State()
+        self.participants = PARTICIPANTS[count]
+        self.fails = FAILS[count]
+
+        self.bots = [p(self.state, i, r) for p, r, i in zip(bots, roles, range(0, count))]
+        self.spies = bitmask(p for p in self.bots if p.spy)
+        self.state.players = [Player(p.name, p.index) for p in self.bots]
+        self.state.leader = self.state.players[0]
+
+        tables = [implemented(p.__class__) for p in self.bots]
+        self.listeners = dict((h, [p for p, t in zip(self.bots, tables) if h in t]) for h in HOOKS)
+        self.masks = dict((h, bitmask(p)) for h, p in self.listeners.items())
+
+    def onPlayerSelected(self, player, team):
+        pass
+
+    def onPlayerVoted(self, player, vote, leader, team):
+        pass
+
+    def onGameComplete(self, win, spies):
+        pass
+
+    @property
+    def won(self):
+        return self.state.wins >= self.NUM_WINS
+
+    @property
+    def lost(self):
+        return self.state.losses >= self.NUM_LOSSES
+
+    def callback(self, name, *args):
+        for p in self.listeners[name]:
+            getattr(p, name)(*args)
+
+    def failed(self, sabotaged):
+        """Check if the current mission fails with this number of sabotages."""
+        return sabotaged >= self.fails[self.state.turn-1]
+
+    def run(self):
+        """Simulate the whole game, with the same phases as Game.run()."""
+        s = self.state
+        spies = set(s.players[i] for i in SEATS[self.spies])
+        for p in self.listeners['onGameRevealed']:
+            p.onGameRevealed(s.players, spies if p.spy else set())
+        s.phase = State.PHASE_SELECTION
+
+        while not self.won and not self.lost:
+            self.attempt()
+            if s.tries > self.MAX_TRIES or self.won or self.lost:
+                break
+            self.announce()
+            s.leader = s.players[(s.leader.index + 1) % len(s.players)]
+            s.phase = State.PHASE_SELECTION
+
+        win = self.won
+        for p in self.listeners['onGameComplete']:
+            p.onGameComplete(win, spies)
+        self.onGameComplete(win, spies)
+
+    def select(self):
+        """Ask the leader for a team and return it as a bitmask."""
+        s = self.state
+        count = self.participants[s.turn-1]
+        leader = self.bots[s.leader.index]
+        selected = leader.select(s.players, count)
+
+        assert type(selected) in [list, set, tuple], "Expecting a list|set|tuple as a return value of select(), not %s." % type(selected)
+        assert len(selected) == count, "The list returned by %s.select() is of the wrong size!  Expecting %i was %i." % (leader.name, count, len(selected))
+        team = 0
+        for p in selected:
+            assert isinstance(p, Player), "Please return Player objects in the list from %s.select()." % (leader.name)
+            assert 0 <= p.index < len(s.players) and s.players[p.index] == p, "The specified Player does not exist in this game: %r." % (p)
+            team |= 1 << p.index
+        assert COUNT[team] == count, "There were duplicate players returned in the list by %s.select()." % (leader.name)
+
+        self.onPlayerSelected(leader, team)
+        s.team = [s.players[p.index] for p in selected]
+        return team
+
+    def attempt(self):
+        """Select a team and vote for it, then run the mission if approved."""
+        s = self.state
+        s.team = None
+        s.votes = None
+        s.sabotages = None
+
+        self.callback('onMissionAttempt', s.turn, s.tries, s.leader)
+        team = self.select()
+        self.callback('onTeamSelected', s.leader, s.team)
+        s.phase = State.PHASE_VOTING
+
+        votes = []
+        for p in self.bots:
+            v = p.vote(s.team)
+            assert type(v) is bool, "Please return a boolean from %s.vote() instead of %s." % (p.name, type(v))
+            self.onPlayerVoted(p, v, s.leader, team)
+            votes.append(v)
+        s.votes = votes[:]
+        self.callback('onVoteComplete', votes[:])
+
+        if sum(votes) * 2 <= len(votes):
+            self.callback('onMissionFailed', s.leader, s.team)
+            s.tries += 1
+            s.phase = State.PHASE_ANNOUNCING
+            return
+
+        s.phase = State.PHASE_MISSION
+        sabotaged = 0
+        for t in s.team:
+            p = self.bots[t.index]
+            result = p.sabotage() and p.spy
+            assert type(result) is bool, "Please return a boolean from %s.sabotage(), not %s." % (p.name, type(result))
+            sabotaged += int(result)
+
+        if self.failed(sabotaged):
+            s.losses += 1
+        else:
+            s.wins += 1
+        s.sabotages = sabotaged
+
+        # The team is notified first, as in Game.onMissionComplete().
+        listeners = self.masks['onMissionComplete']
+        for t in s.team:
+            if listeners & (1 << t.index):
+                self.bots[t.index].onMissionComplete(sabotaged)
+        for i in SEATS[listeners & ~team]:
+            self.bots[i].onMissionComplete(sabotaged)
+
+        s.phase = State.PHASE_ANNOUNCING
+        s.turn += 1
+        s.tries = 1
+
+    def announce(self):
+        """Allow bots to publicly announce what they want about the game."""
+        s = self.state
+        announcements = [(s.players[p.index], p.announce()) for p in self.listeners['announce']]
+        for source, ann in announcements:
+            if not ann:
+                continue
+            copy = {}
+            assert type(ann) is dict, "Please return a dictionary from %s.announce(), not %s." % (source.name, type(ann))
+            for k, v in ann.items():
+                assert isinstance(k, Player), "Please use Player objects as dictionary key in %s.announce()." % (source.name)
+                assert isinstance(v, float), "Please use floats as dictionary values in %s.announce()." % (source.name)
+                copy[Player(k.name, k.index)] = v
+            for other in self.listeners['onAnnouncement']:
+                if other.index != source.index:
+                    other.onAnnouncement(source, copy)
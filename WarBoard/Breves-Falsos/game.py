@@ -1,6 +1,22 @@
 import itertools
 
-from player import Player
+from player import Player, Bot
+import core
+
+
+# Functions of the bot API that may do nothing, and are only called for bots
+# that implement them.
+HOOKS = [m for m in dir(Bot) if m.startswith('on')] + ['announce']
+
+# Cache of the hooks implemented by each class of bots.
+_hooks = {}
+
+def implemented(klass):
+    """Set of the HOOKS that do something for the given class of bots."""
+    result = _hooks.get(klass)
+    if result is None:
+        result = _hooks[klass] = frozenset(h for h in HOOKS if core.overrides(klass, h, Bot))
+    return result
 
 
 class State(object):
@@ -254,6 +270,10 @@ class Game(BaseGame):
         self.state.players = [Player(p.name, p.index) for p in self.bots]
         self.state.leader = self.next_leader()
 
+        # Bots that implement each of the hooks, in order, so the others are skipped.
+        tables = [implemented(p.__class__) for p in self.bots]
+        self.listeners = dict((h, [p for p, t in zip(self.bots, tables) if h in t]) for h in HOOKS)
+
     def onPlayerSelected(self, player, team):
         pass
 
@@ -261,13 +281,13 @@ class Game(BaseGame):
         pass
 
     def callback(self, name, *args):
-        for p in self.bots:
+        for p in self.listeners[name]:
             getattr(p, name)(*args)
         getattr(self, name)(*args)
 
     def onGameRevealed(self, players, spies):
         # Tell the bots who the spies are if they are allowed to know.        
-        for p in self.bots:
+        for p in self.listeners['onGameRevealed']:
             p.onGameRevealed(self.state.players, spies if p.spy else set())
 
     def get_selection(self, count):
@@ -299,13 +319,15 @@ class Game(BaseGame):
         # Pass back the results of the mission to the bots.
         # Process the team first to make sure any timing of the result
         # is the same for all player roles, specifically over IRC.
+        listeners = self.listeners['onMissionComplete']
         for s in self.state.team:
             p = self.bots[s.index]
-            p.onMissionComplete(sabotaged)
+            if p in listeners:
+                p.onMissionComplete(sabotaged)
 
         # Now, with delays taken into account, all other results can be
         # passed back safely without divulging Spy/Resistance identities.
-        for p in [b for b in self.bots if b not in self.state.team]:
+        for p in [b for b in listeners if b not in self.state.team]:
             p.onMissionComplete(sabotaged)
         
     def get_sabotages(self):
@@ -318,8 +340,8 @@ class Game(BaseGame):
         return sabotaged
 
     def onAnnouncement(self, player, announcement):
-        for other in [o for o in self.bots if o != player]:
+        for other in [o for o in self.listeners['onAnnouncement'] if o != player]:
             other.onAnnouncement(player, announcement)
 
     def get_announcements(self):
-        return [(p, ann) for p, ann in [(Player(p.name, p.index), p.announce()) for p in self.bots] if ann]
+        return [(p, ann) for p, ann in [(Player(p.name, p.index), p.announce()) for p in self.listeners['announce']] if ann]
@@ -0,0 +1,102 @@
+from __future__ import print_function
+
+import collections
+import time
+
+from player import Bot
+
+
+# Most precise clock available for measuring short durations.
+timer = getattr(time, 'perf_counter', time.time)
+
+# All the functions of the bot API that are called by the game engine.
+METHODS = ['select', 'vote', 'sabotage', 'announce'] + sorted([m for m in dir(Bot) if m.startswith('on')])
+
+
+class Histogram(object):
+    """Distribution of durations, counted in buckets of increasing powers of
+    two microseconds so it stays small and can be merged across processes."""
+
+    BUCKETS = 32
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0.0
+        self.samples = 0
+        self.maximum = 0.0
+
+    def sample(self, duration):
+        self.counts[min(int(duration * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.total += duration
+        self.samples += 1
+        self.maximum = max(self.maximum, duration)
+
+    def mean(self):
+        return self.total / self.samples if self.samples else 0.0
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket containing the given fraction of samples,
+        as an approximation of the actual percentile, in seconds."""
+        threshold, count = fraction * self.samples, 0
+        for i, c in enumerate(self.counts):
+            count += c
+            if count >= threshold:
+                return min((1 << i) * 1e-6, self.maximum)
+        return self.maximum
+
+    def __iadd__(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.samples += other.samples
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+
+def timed(method, histogram):
+    def wrapper(*args, **kwargs):
+        start = timer()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            histogram.sample(timer() - start)
+    return wrapper
+
+
+class Latency(object):
+    """Wall time spent in each function of the bot API, per bot class.  This is
+    optional instrumentation for a game, which wraps the functions of the bot
+    instances so there's no cost at all for games that aren't instrumented."""
+
+    def __init__(self):
+        self.histograms = collections.defaultdict(Histogram)
+
+    def instrument(self, game):
+        """Time all the API calls made to the bots of this game from now on."""
+        for bot in game.bots:
+            for name in METHODS:
+                histogram = self.histograms[(bot.name, name)]
+                setattr(bot, name, timed(getattr(bot, name), histogram))
+
+    def __iadd__(self, other):
+        for key, histogram in other.histograms.items():
+            self.histograms[key] += histogram
+        return self
+
+    def costs(self):
+        """Total time spent in each bot class, sorted from the slowest."""
+        totals = collections.defaultdict(float)
+        for (name, _), histogram in self.histograms.items():
+            totals[name] += histogram.total
+        return sorted(totals.items(), key = lambda x: x[1], reverse = True)
+
+    def show(self):
+        print("LATENCY\t\t\t\t(calls,\t mean,\t\t p99,\t\t max,\t\t total)")
+        for name, total in self.costs():
+            print("  {0:<16s} {1:.2f}s".format(name, total))
+            for method in METHODS:
+                h = self.histograms.get((name, method))
+                if not h or not h.samples:
+                    continue
+                print("    {0:<18s} {1:>8d}\t {2:8.3f}ms\t {3:8.3f}ms\t {4:8.3f}ms\t {5:.2f}s".format(
+                        method, h.samples, h.mean() * 1e3, h.percentile(0.99) * 1e3, h.maximum * 1e3, h.total))
+        print("")
@@ -398,11 +398,10 @@ class ResistanceCompetitionHandler(CompetitionRunner):
         self.games.remove(g)
 
         for b in g.bots:
-            s = g.statistics.get(b.name)
             if b.spy:
-                s.spyWins.sample(int(not g.won))
+                g.statistics.sample(b.name, 'spyWins', int(not g.won))
             else:
-                s.resWins.sample(int(g.won))
+                g.statistics.sample(b.name, 'resWins', int(g.won))
         return g
 
     def _play(self, count, candidates, result):
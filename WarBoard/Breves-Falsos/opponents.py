@@ -0,0 +1,385 @@
+import collections
+import threading
+import zlib
+import time
+import sys
+import os
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from multiprocessing.managers import BaseManager
+
+
+# Shared secret used by the workers to connect to the store.
+AUTHKEY = b'resistance'
+
+
+class Table(object):
+    """Counters shared by all the workers of a competition, which live in the
+    server process of the Store.  Workers send the increments they learned
+    since their last merge in a single batch, and get back all the counters
+    that other workers changed in the meantime, tracked by version.  Only the
+    last version that changed each counter is kept, so the memory used stays
+    proportional to the number of counters."""
+
+    def __init__(self):
+        self.values = {}
+        self.versions = {}
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def merge(self, delta, version):
+        with self.lock:
+            if delta:
+                self.version += 1
+                for key, value in delta.items():
+                    self.values[key] = self.values.get(key, 0.0) + value
+                    self.versions[key] = self.version
+            if version >= self.version:
+                return self.version, {}
+            return self.version, dict((k, self.values[k]) for k, v in self.versions.items() if v > version)
+
+    def size(self):
+        return len(self.values)
+
+
+# The single table of the server process, see shared().
+table = None
+
+
+def shared():
+    global table
+    if table is None:
+        table = Table()
+    return table
+
+
+class StoreManager(BaseManager):
+    pass
+
+StoreManager.register('table', callable=shared)
+
+
+class Store(object):
+    """Server process holding the shared table of opponent models, started by
+    the runner for the duration of a competition.  Only its address needs to
+    be sent to the workers, see connect()."""
+
+    def __init__(self, address=None, authkey=AUTHKEY):
+        self.manager = StoreManager(address, authkey)
+        self.manager.start()
+        self.address = self.manager.address
+        self.authkey = authkey
+
+    def shutdown(self):
+        self.manager.shutdown()
+
+
+class Model(object):
+    """Adapter between the class-level statistics of a learner bot and a flat
+    dictionary of counters, which can be added up across processes.  Only the
+    first of its modules that was imported is shared."""
+
+    modules = ()
+
+    def module(self):
+        for name in self.modules:
+            if name in sys.modules:
+                return sys.modules[name]
+        return None
+
+    def export(self, module):
+        """Generate all the counters as (key, value) pairs."""
+        raise NotImplementedError
+
+    def load(self, module, values):
+        """Overwrite the counters from a dictionary of some of the keys."""
+        raise NotImplementedError
+
+    def snapshot(self, module):
+        """State of the model that reset() goes back to, by default a copy of
+        all its counters."""
+        return dict(self.export(module))
+
+    def reset(self, module, state):
+        """Put the model back in a state from snapshot().  By default, the
+        counters created since then are set to zero."""
+        values = dict((key, 0.0) for key, _ in self.export(module))
+        values.update(state)
+        self.load(module, values)
+
+
+class Statistician(Model):
+    modules = ('learners', 'bots.learners')
+
+    def export(self, module):
+        for name, statistics in module.Statistician.global_statistics.items():
+            for attribute, v in vars(statistics).items():
+                yield (name, attribute, 'total'), v.total
+                yield (name, attribute, 'samples'), v.samples
+
+    def load(self, module, values):
+        statistics = module.Statistician.global_statistics
+        for (name, attribute, field), value in values.items():
+            setattr(getattr(statistics[name], attribute), field, value)
+
+    def reset(self, module, state):
+        module.Statistician.global_statistics.clear()
+        self.load(module, state)
+
+
+class Prediction(Model):
+    modules = ('dkreuter', 'bots.1.dkreuter')
+
+    def export(self, module):
+        for name, statistics in module.Prediction.track.items():
+            for attribute, var in vars(statistics).items():
+                for input, counts in var.a.items():
+                    yield (name, attribute, input, 0), counts[0]
+                    yield (name, attribute, input, 1), counts[1]
+
+    def load(self, module, values):
+        track = module.Prediction.track
+        for (name, attribute, input, i), value in values.items():
+            var = getattr(track.setdefault(name, module.GlobalStats()), attribute)
+            var.a.setdefault(input, [0, 0])[i] = value
+
+    def reset(self, module, state):
+        module.Prediction.track.clear()
+        self.load(module, state)
+
+
+class Magi(Model):
+    modules = ('mp', 'bots.1.mp')
+
+    def sides(self, module):
+        return (('spy', module.Magi.globalSpyPlayerStats), ('resistance', module.Magi.globalResistancePlayerStats))
+
+    def export(self, module):
+        for side, stats in self.sides(module):
+            for name, events in stats.playersStats.items():
+                for event, s in events.items():
+                    yield (side, name, event, 'ocurrences'), s.ocurrences
+                    yield (side, name, event, 'totalSucesos'), s.totalSucesos
+
+    def load(self, module, values):
+        sides = dict(self.sides(module))
+        for (side, name, event, field), value in values.items():
+            events = sides[side].playersStats.setdefault(name, {})
+            if event not in events:
+                events[event] = module.Statistic()
+            setattr(events[event], field, value)
+
+    def reset(self, module, state):
+        for side, stats in self.sides(module):
+            stats.playersStats.clear()
+        self.load(module, state)
+
+
+class Clymily(Model):
+    modules = ('clymily', 'bots.1.clymily')
+
+    def export(self, module):
+        for topic, variables in module.allPlayerStats._data.items():
+            for key, v in variables.items():
+                yield (topic, key, 'total'), v.total
+                yield (topic, key, 'samples'), v.samples
+
+    def load(self, module, values):
+        data = module.allPlayerStats._data
+        for (topic, key, field), value in values.items():
+            if topic not in data:
+                data[topic] = collections.defaultdict(module.Variable)
+            setattr(data[topic][key], field, value)
+        # The estimates memoised by the bots are based on the old values.
+        module.allPlayerStats.forget()
+
+    def snapshot(self, module):
+        # The counters live in a database, which a new process would open.
+        return None
+
+    def reset(self, module, state):
+        module.allPlayerStats.load()
+
+
+# Adapters for all the learner bots that ship with the framework, by name.
+MODELS = collections.OrderedDict((m.__class__.__name__, m) for m in [Statistician(), Prediction(), Magi(), Clymily()])
+
+
+class Client(object):
+    """Connection of a process to the Store, which merges the models of the
+    bots imported here with those of all the other workers on sync().
+
+    The store only holds what was learned during the competition.  The state
+    of each model when first seen, e.g. loaded from disk on import, is kept
+    locally and assumed to be the same in all the workers."""
+
+    # Minimum number of seconds between two syncs unless forced, since the
+    # models of some bots have thousands of counters to compare.
+    INTERVAL = 1.0
+
+    def __init__(self, address, authkey=AUTHKEY):
+        manager = StoreManager(address, authkey)
+        manager.connect()
+        self.table = manager.table()
+        self.version = 0
+        self.initial = {}
+        self.seen = {}
+        self.pid = os.getpid()
+        self.synced = None
+
+    def sync(self, force=False):
+        """Send the increments of all the models since the last sync, and load
+        the counters merged from all the workers into the bots.  Does nothing
+        if the last sync was too recent, unless forced."""
+        if not force and self.synced is not None and time.time() - self.synced < self.INTERVAL:
+            return 0, 0
+        self.synced = time.time()
+        active = []
+        delta = {}
+        for name, model in MODELS.items():
+            module = model.module()
+            if module is None:
+                continue
+            active.append((name, model, module))
+            current = dict(((name,) + key, value) for key, value in model.export(module))
+            if name not in self.initial:
+                self.initial[name] = current
+                continue
+            initial = self.initial[name]
+            for key, value in current.items():
+                d = value - initial.get(key, 0.0) - self.seen.get(key, 0.0)
+                if abs(d) > 1e-9:
+                    delta[key] = d
+
+        self.version, changed = self.table.merge(delta, self.version)
+        self.seen.update(changed)
+        for name, model, module in active:
+            initial = self.initial[name]
+            values = dict((key[1:], initial.get(key, 0.0) + value) for key, value in changed.items() if key[0] == name)
+            if values:
+                model.load(module, values)
+        return len(delta), len(changed)
+
+
+# State of each model when it was first seen in this process, by reset().
+initial = {}
+
+
+def reset():
+    """Put the models of the bots in this process back in the state they had
+    when first seen, usually just after they were imported, as if the process
+    had just started.  Long-lived workers call this before each competition,
+    so what the bots learned in one doesn't carry over to the next."""
+    for name, model in MODELS.items():
+        module = model.module()
+        if module is None:
+            continue
+        if name not in initial:
+            initial[name] = model.snapshot(module)
+        else:
+            model.reset(module, initial[name])
+    # The snapshots of trained models are loaded again by warm().
+    restored.clear()
+
+
+# Client of this process for each store, created by connect().
+clients = {}
+
+
+def connect(address, authkey=AUTHKEY):
+    """Client of this process for the store at the given address, which is not
+    inherited by the child processes so each of them has its own connection."""
+    c = clients.get(address)
+    if c is None or c.pid != os.getpid():
+        c = clients[address] = Client(address, authkey)
+    return c
+
+
+# Version of the format of the snapshot files, see save().
+FORMAT = 1
+
+
+def snapshots(folder, name):
+    """List the versions of the snapshots of a model in a folder, as sorted
+    pairs of (version, filename)."""
+    result = []
+    if not os.path.isdir(folder):
+        return result
+    for filename in os.listdir(folder):
+        parts = filename.split('.')
+        if len(parts) == 3 and parts[0] == name and parts[2] == 'snapshot' and parts[1].isdigit():
+            result.append((int(parts[1]), os.path.join(folder, filename)))
+    return sorted(result)
+
+
+def read(filename):
+    """Load a snapshot file, as a dictionary with the model's name, version,
+    the number of games it learned from and its counters."""
+    with open(filename, 'rb') as f:
+        data = pickle.loads(zlib.decompress(f.read()))
+    assert data['format'] == FORMAT, "Snapshot %s has format %r, expected %r." % (filename, data['format'], FORMAT)
+    return data
+
+
+def save(folder, games=0):
+    """Write a new version of the snapshot of each model in this process, with
+    the number of games played since the previous version.  Counters that are
+    zero are left out and the files are compressed, so they stay small."""
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    filenames = []
+    for name, model in MODELS.items():
+        module = model.module()
+        if module is None:
+            continue
+        previous = snapshots(folder, name)
+        version, total = 1, games
+        if previous:
+            version, total = previous[-1][0] + 1, read(previous[-1][1])['games'] + games
+        data = {
+            'format': FORMAT,
+            'model': name,
+            'version': version,
+            'games': total,
+            'time': time.time(),
+            'counters': dict((k, v) for k, v in model.export(module) if v),
+        }
+        filename = os.path.join(folder, '%s.%i.snapshot' % (name, version))
+        temporary = filename + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps(data, 2)))
+        os.rename(temporary, filename)
+        filenames.append(filename)
+    return filenames
+
+
+def restore(folder):
+    """Load the latest snapshot of each model in this process from a folder,
+    overwriting the counters of the bots with those in the snapshot.  Returns
+    the snapshots that were loaded, without their counters, by model name."""
+    loaded = {}
+    for name, model in MODELS.items():
+        module = model.module()
+        versions = snapshots(folder, name)
+        if module is None or not versions:
+            continue
+        data = read(versions[-1][1])
+        model.load(module, data.pop('counters'))
+        loaded[name] = data
+    return loaded
+
+
+# Folders of snapshots restored in this process, by warm().
+restored = {}
+
+
+def warm(folder):
+    """Restore the snapshots from a folder once per process, before the first
+    game, including in worker processes that were not forked after it."""
+    if restored.get(folder) != os.getpid():
+        restored[folder] = os.getpid()
+        restore(folder)
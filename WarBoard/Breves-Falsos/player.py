@@ -1,6 +1,4 @@
-import logging
-import logging.handlers
-
+import botlog
 import core
 
 
@@ -193,14 +191,7 @@ class Bot(Player):
         self.game = game
         self.spy = spy
 
-        self.log = logging.getLogger(self.name)
-        if not self.log.handlers:
-            try:
-                output = logging.FileHandler(filename='logs/'+self.name+'.log')
-                self.log.addHandler(output)
-                self.log.setLevel(logging.DEBUG)
-            except IOError:
-                pass
+        self.log = botlog.getLogger(self.name)
 
     def __repr__(self):
         """Built-in function to support pretty-printing."""
@@ -0,0 +1,199 @@
+import collections
+import binascii
+import socket
+import array
+import json
+import os
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Columns of each table, with the typecode of the array that stores them.  All
+# the tables are keyed by the game id, see key().  Teams, votes and spies are
+# bitmasks over the seats, and players are stored as their seat.
+SCHEMA = collections.OrderedDict([
+    # One row per game, written once it's complete.  The forfeit is the seat
+    # of the bot that ran out of time, or -1.
+    ('games', [('game', 'i'), ('seedLow', 'I'), ('seedHigh', 'I'), ('players', 'B'), ('spies', 'H'),
+               ('won', 'B'), ('wins', 'B'), ('losses', 'B'), ('forfeit', 'b')]),
+    # One row per seat, with the index of the bot in the manifest.
+    ('seats', [('game', 'i'), ('seat', 'B'), ('bot', 'H'), ('spy', 'B')]),
+    # One row per team that was selected and voted on.
+    ('attempts', [('game', 'i'), ('turn', 'B'), ('tries', 'B'), ('leader', 'B'), ('team', 'H'), ('votes', 'H')]),
+    # One row per mission that was run, with the spies that chose to sabotage.
+    ('missions', [('game', 'i'), ('turn', 'B'), ('sabotages', 'B'), ('saboteurs', 'H')]),
+    # One row per player mentioned in an announcement.
+    ('announcements', [('game', 'i'), ('turn', 'B'), ('tries', 'B'), ('source', 'B'), ('subject', 'B'), ('value', 'f')]),
+])
+
+MANIFEST = 'manifest.json'
+
+
+def key(index, variant=0):
+    """Game id for the game at the given index of the schedule.  In paired
+    mode the second game of each pair is variant 1, so both can be stored."""
+    return index * 2 + variant
+
+
+def bitmask(players):
+    m = 0
+    for p in players:
+        m |= 1 << p.index
+    return m
+
+
+def manifest(folder, bots, **info):
+    """Create the folder and the manifest that lists the bots, whose position
+    in the list is used as their id in the tables.  An existing manifest must
+    list the same bots, since the records can't be mixed otherwise."""
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    filename = os.path.join(folder, MANIFEST)
+    if os.path.exists(filename):
+        with open(filename) as f:
+            data = json.load(f)
+        assert data['bots'] == bots, "The bots %r do not match the records in %s." % (bots, folder)
+        return data
+
+    data = dict(info, bots=bots, schema=SCHEMA)
+    with open(filename, 'w') as f:
+        json.dump(data, f)
+    return data
+
+
+class Recorder(object):
+    """Append-only store of all the events of the games played in this process.
+    Each process writes its own shard of the folder, with one file per column
+    of each table, so the workers never need to lock anything.  Rows are kept
+    in memory until flush() is called or the buffers are full."""
+
+    ROWS = 1 << 16
+
+    def __init__(self, folder, bots):
+        self.bots = dict((name, i) for i, name in enumerate(bots))
+        # Process ids are reused, so a later run never appends to this shard.
+        token = binascii.hexlify(os.urandom(4)).decode('ascii')
+        self.shard = os.path.join(folder, '%s-%i-%s' % (socket.gethostname(), os.getpid(), token))
+        if not os.path.exists(self.shard):
+            os.makedirs(self.shard)
+        self.columns = dict((t, [(c, array.array(code)) for c, code in columns]) for t, columns in SCHEMA.items())
+        self.rows = 0
+        self.pid = os.getpid()
+
+    def append(self, table, *row):
+        for (_, column), value in zip(self.columns[table], row):
+            column.append(value)
+        self.rows += 1
+
+    def instrument(self, game, id, seed):
+        """Record the events of this game from now on, until complete()."""
+        state = game.state
+        game.recording = (id, seed or 0)
+        for bot in game.bots:
+            self.append('seats', id, bot.index, self.bots[bot.name], int(bot.spy))
+
+        def onVoteComplete(votes, callback=game.onVoteComplete):
+            self.append('attempts', id, state.turn, state.tries, state.leader.index,
+                        bitmask(state.team), sum(1 << i for i, v in enumerate(votes) if v))
+            callback(votes)
+
+        def onMissionComplete(sabotaged, callback=game.onMissionComplete):
+            self.append('missions', id, state.turn, sabotaged, saboteurs[0])
+            saboteurs[0] = 0
+            callback(sabotaged)
+
+        def onAnnouncement(source, announcement, callback=game.onAnnouncement):
+            for subject, value in announcement.items():
+                self.append('announcements', id, state.turn, state.tries, source.index, subject.index, value)
+            callback(source, announcement)
+
+        saboteurs = [0]
+        def sabotage(bot, method):
+            def wrapper():
+                result = method()
+                if result is True:
+                    saboteurs[0] |= 1 << bot.index
+                return result
+            return wrapper
+
+        game.onVoteComplete = onVoteComplete
+        game.onMissionComplete = onMissionComplete
+        game.onAnnouncement = onAnnouncement
+        for bot in game.bots:
+            if bot.spy:
+                bot.sabotage = sabotage(bot, bot.sabotage)
+
+    def complete(self, game, won, forfeit=None):
+        """Record the outcome of a game, then flush if the buffers are full."""
+        id, seed = game.recording
+        self.append('games', id, seed & 0xFFFFFFFF, (seed >> 32) & 0xFFFFFFFF, len(game.bots),
+                    bitmask(b for b in game.bots if b.spy), int(won), game.state.wins, game.state.losses,
+                    forfeit.index if forfeit else -1)
+        if self.rows >= self.ROWS:
+            self.flush()
+
+    def flush(self):
+        """Append all the rows in memory to the files of the shard.  The tables
+        are written one column at a time, so a crash may leave some columns of
+        a table longer than others, which read() ignores."""
+        for table, columns in self.columns.items():
+            for name, column in columns:
+                if not column:
+                    continue
+                with open(os.path.join(self.shard, '%s.%s' % (table, name)), 'ab') as f:
+                    column.tofile(f)
+                del column[:]
+        self.rows = 0
+
+
+# Recorder for each folder in this process, created by get().
+recorders = {}
+
+
+def get(folder, bots):
+    """Recorder of this process for the given folder, which is not inherited
+    by the child processes so that each of them writes its own shard."""
+    r = recorders.get(folder)
+    if r is None or r.pid != os.getpid():
+        r = recorders[folder] = Recorder(folder, bots)
+    return r
+
+
+def shards(folder):
+    return sorted(os.path.join(folder, d) for d in os.listdir(folder) if os.path.isdir(os.path.join(folder, d)))
+
+
+def read(folder, table):
+    """Load all the columns of a table from every shard of the folder, as a
+    dictionary of arrays.  With NumPy, the columns of each shard are memory-
+    mapped and only copied when the folder contains multiple shards."""
+    parts = collections.defaultdict(list)
+    for shard in shards(folder):
+        columns = []
+        for name, code in SCHEMA[table]:
+            filename = os.path.join(shard, '%s.%s' % (table, name))
+            size = os.path.getsize(filename) if os.path.exists(filename) else 0
+            columns.append((name, code, filename, size // array.array(code).itemsize))
+        rows = min(c[3] for c in columns)
+        for name, code, filename, _ in columns:
+            if rows == 0:
+                continue
+            if numpy is not None:
+                parts[name].append(numpy.memmap(filename, dtype=numpy.dtype(code), mode='r', shape=(rows,)))
+            else:
+                column = array.array(code)
+                with open(filename, 'rb') as f:
+                    column.fromfile(f, rows)
+                parts[name].append(column)
+
+    result = {}
+    for name, code in SCHEMA[table]:
+        chunks = parts[name]
+        if numpy is not None:
+            result[name] = chunks[0] if len(chunks) == 1 else numpy.concatenate(chunks or [numpy.zeros(0, dtype=numpy.dtype(code))])
+        else:
+            result[name] = sum(chunks, array.array(code))
+    return result
@@ -0,0 +1,242 @@
+from __future__ import print_function
+
+import collections
+import random
+import array
+import json
+import time
+import os
+
+from player import Bot
+from game import Game
+import recorder
+
+
+class Divergence(Exception):
+    """Raised when the bot under test makes a decision that doesn't match the
+    recorded game, after which the rest of the recording no longer applies."""
+
+    def __init__(self, record, method, recorded, actual):
+        turn, tries = record.state.turn, record.state.tries
+        super(Divergence, self).__init__("Game %i diverged in %s() on mission %i, try %i: recorded %r but got %r." \
+                                         % (record.id, method, turn, tries, recorded, actual))
+        self.method = method
+        self.turn = turn
+        self.tries = tries
+        self.recorded = recorded
+        self.actual = actual
+
+
+class Record(object):
+    """All the decisions made in a recorded game, indexed by the mission and
+    the attempt so they can be looked up as a replay progresses.  Teams and
+    votes are bitmasks over the seats, like in the recorder tables."""
+
+    def __init__(self, id, seed, won, forfeit):
+        self.id = id
+        self.seed = seed
+        self.won = won
+        self.forfeit = forfeit
+        self.names = {}
+        self.roles = {}
+        self.teams = {}
+        self.votes = {}
+        self.saboteurs = {}
+        self.announcements = collections.defaultdict(dict)
+        self.state = None
+
+    @property
+    def bots(self):
+        return [self.names[i] for i in range(len(self.names))]
+
+    def team(self):
+        return self.teams.get((self.state.turn, self.state.tries))
+
+    def vote(self, index):
+        votes = self.votes.get((self.state.turn, self.state.tries))
+        return None if votes is None else bool(votes & (1 << index))
+
+    def sabotage(self, index):
+        return bool(self.saboteurs.get(self.state.turn, 0) & (1 << index))
+
+    def announcement(self, index):
+        return self.announcements.get((self.state.turn, self.state.tries, index), {})
+
+
+def load(folder):
+    """Read all the complete games recorded in a folder, see recorder.py, as
+    a dictionary of Records by game id."""
+    with open(os.path.join(folder, recorder.MANIFEST)) as f:
+        bots = json.load(f)['bots']
+
+    games = recorder.read(folder, 'games')
+    records = {}
+    for id, low, high, won, forfeit in zip(games['game'], games['seedLow'], games['seedHigh'], games['won'], games['forfeit']):
+        records[int(id)] = Record(int(id), (int(high) << 32) | int(low), bool(won), int(forfeit))
+
+    def rows(table, *columns):
+        data = recorder.read(folder, table)
+        for row in zip(*[data[c] for c in ('game',) + columns]):
+            r = records.get(int(row[0]))
+            if r is not None:
+                yield (r,) + tuple(int(v) if c != 'value' else float(v) for c, v in zip(columns, row[1:]))
+
+    for r, seat, bot, spy in rows('seats', 'seat', 'bot', 'spy'):
+        r.names[seat] = bots[bot]
+        r.roles[seat] = bool(spy)
+    for r, turn, tries, team, votes in rows('attempts', 'turn', 'tries', 'team', 'votes'):
+        r.teams[(turn, tries)] = team
+        r.votes[(turn, tries)] = votes
+    for r, turn, saboteurs in rows('missions', 'turn', 'saboteurs'):
+        r.saboteurs[turn] = saboteurs
+    for r, turn, tries, source, subject, value in rows('announcements', 'turn', 'tries', 'source', 'subject', 'value'):
+        r.announcements[(turn, tries, source)][subject] = value
+    return records
+
+
+class Scripted(Bot):
+    """Stand-in for a recorded bot, which repeats its decisions.  A subclass
+    with the name of the original bot is used, so the players are the same."""
+
+    def select(self, players, count):
+        team = self.record.team()
+        return [p for p in players if team & (1 << p.index)]
+
+    def vote(self, team):
+        return self.record.vote(self.index)
+
+    def sabotage(self):
+        return self.record.sabotage(self.index)
+
+    def announce(self):
+        players = self.game.players
+        return dict((players[i], v) for i, v in self.record.announcement(self.index).items())
+
+
+# Stand-in classes for each name of recorded bots, created by scripted().
+standins = {}
+
+
+def scripted(name):
+    klass = standins.get(name)
+    if klass is None:
+        klass = standins[name] = type(Scripted)(str(name), (Scripted,), {})
+    return klass
+
+
+def checked(record, bot):
+    """Wrap the decisions of the live bot so they're compared to the record."""
+
+    def check(method, recorded, actual):
+        if recorded != actual:
+            raise Divergence(record, method, recorded, actual)
+
+    def select(players, count, method=bot.select):
+        selected = method(players, count)
+        check('select', record.team(), recorder.bitmask(selected))
+        return selected
+
+    def vote(team, method=bot.vote):
+        v = method(team)
+        check('vote', record.vote(bot.index), v)
+        return v
+
+    def sabotage(method=bot.sabotage):
+        s = method()
+        if bot.spy:
+            check('sabotage', record.sabotage(bot.index), s)
+        return s
+
+    def announce(method=bot.announce):
+        ann = method()
+        # Values are recorded with single precision.
+        actual = dict((p.index, array.array('f', [v])[0]) for p, v in (ann or {}).items())
+        check('announce', record.announcement(bot.index), actual)
+        return ann
+
+    bot.select, bot.vote, bot.sabotage, bot.announce = select, vote, sabotage, announce
+
+
+def replay(record, bot, seat):
+    """Play a recorded game again with the given bot class in a seat, and the
+    recorded decisions for all the others.  Returns the game, or raises a
+    Divergence as soon as the bot decides differently.
+
+    The random number generator is seeded like in the recorded game, but the
+    stand-ins don't draw any numbers, so only the decisions of deterministic
+    bots can be expected to match exactly."""
+    assert record.forfeit < 0, "Game %i was forfeited, so its recording is incomplete." % (record.id)
+    bots = [bot if i == seat else scripted(name) for i, name in enumerate(record.bots)]
+    random.seed(record.seed)
+    g = Game(bots, [record.roles[i] for i in range(len(bots))])
+    record.state = g.state
+    for b in g.bots:
+        b.record = record
+    checked(record, g.bots[seat])
+    g.run()
+    if g.won != record.won:
+        raise Divergence(record, 'onGameComplete', record.won, g.won)
+    return g
+
+
+def replayAll(records, bot, name=None):
+    """Replay all the games in which the named bot played, by default the
+    bot's own name, with the given bot class in its seats.  Returns the list
+    of (id, seat, divergence) for the games that diverged, and the number of
+    games that were replayed."""
+    name = name or bot.__name__
+    diverged, count = [], 0
+    for id, record in sorted(records.items()):
+        if record.forfeit >= 0:
+            continue
+        for seat, n in enumerate(record.bots):
+            if n != name:
+                continue
+            count += 1
+            try:
+                replay(record, bot, seat)
+            except Divergence as d:
+                diverged.append((id, seat, d))
+    return diverged, count
+
+
+if __name__ == '__main__':
+    import argparse
+    from competition import getCompetitors
+
+    parser = argparse.ArgumentParser(usage='replay.py records (filename|module.BotName)')
+    parser.add_argument('folder', type=str,
+                help = "Folder with games recorded by competition.py --record.")
+    parser.add_argument('bot', type=str,
+                help = "Bot to replay in the seats of the recorded bot.")
+    parser.add_argument('--name', type=str, required=False, default=None,
+                help = "Name of the recorded bot to replace, by default the same as the bot.")
+    parser.add_argument('--game', type=int, required=False, default=None,
+                help = "Replay only the game with this id, and show the first divergence.")
+    args = parser.parse_args()
+
+    bots = getCompetitors([args.bot])
+    if len(bots) != 1:
+        parser.error("Expecting a single bot, like module.BotName.")
+    bot = bots[0]
+
+    start = time.time()
+    records = load(args.folder)
+    if args.game is not None:
+        records = {args.game: records[args.game]}
+    loaded = time.time()
+    diverged, count = replayAll(records, bot, args.name)
+    elapsed = time.time() - loaded
+
+    print("Replayed %i games in %.2fs (%.2fms per game, %.2fs loading)." \
+          % (count, elapsed, elapsed * 1e3 / max(count, 1), loaded - start))
+    if args.game is not None:
+        for id, seat, d in diverged:
+            print("SEAT #%i %s" % (seat, d))
+        if not diverged:
+            print("IDENTICAL")
+    else:
+        print("DIVERGED\t%i (%.1f%%)" % (len(diverged), len(diverged) * 100.0 / max(count, 1)))
+        methods = collections.Counter((d.method, d.turn) for _, _, d in diverged)
+        for (method, turn), n in sorted(methods.items()):
+            print("  {0:<16s} mission {1}\t {2:>8d}".format(method, turn, n))
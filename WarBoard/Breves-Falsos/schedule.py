@@ -0,0 +1,184 @@
+import collections
+import itertools
+import random
+
+
+# All the possible ways of assigning two spies to a table of five players.
+ROLES = sorted(set(itertools.permutations([True, True, False, False, False])), reverse=True)
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def mix(value, key):
+    """Hash two integers into a well distributed 64-bit integer, based on the
+    finalizer of SplitMix64.  This is stable across processes and platforms,
+    unlike the built-in hash() function."""
+    z = (value + (key + 1) * 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+class Permutation(object):
+    """Pseudo-random bijection over range(size) that can be evaluated for any
+    index without storing the permutation itself.  This uses a small Feistel
+    network over the next even power of two, and cycle-walks until the output
+    falls back within range."""
+
+    ROUNDS = 4
+
+    def __init__(self, size, key):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        self.keys = [mix(key, r) for r in range(self.ROUNDS)]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        assert 0 <= index < self.size, "Index %i out of range for permutation." % (index)
+        while True:
+            left, right = index >> self.half, index & self.mask
+            for k in self.keys:
+                left, right = right, left ^ (mix(right, k) & self.mask)
+            index = (left << self.half) | right
+            if index < self.size:
+                return index
+
+
+class Schedule(object):
+    """Streaming list of the games to play in a competition, as (players, roles)
+    tuples.  Every seating and role permutation of the competitors is played
+    once in a random order before any of them repeats, and each further pass
+    over all permutations uses a different random order.
+
+    Games are computed on demand from their position in the schedule, so the
+    memory used depends only on the number of competitors."""
+
+    def __init__(self, competitors, rounds, seed=None):
+        self.competitors = list(competitors)
+        self.rounds = rounds
+        self.seed = seed if seed is not None else random.getrandbits(64)
+
+        self.seatings = 0
+        if len(self.competitors) >= 5:
+            self.seatings = 1
+            for i in range(5):
+                self.seatings *= len(self.competitors) - i
+        self.size = self.seatings * len(ROLES)
+        self._order = (None, None)
+
+    def __len__(self):
+        return self.rounds
+
+    def __getitem__(self, index):
+        """Lookup the game at the given position in the schedule, starting from
+        zero.  Indices past the number of rounds are also valid."""
+        epoch, offset = divmod(index, self.size)
+        if self._order[0] != epoch:
+            self._order = (epoch, Permutation(self.size, mix(self.seed, epoch)))
+        seating, layout = divmod(self._order[1][offset], len(ROLES))
+        return self.seating(seating), ROLES[layout]
+
+    def gameSeed(self, index):
+        """Derive the seed of the random number generator for the game at the
+        given position, so it can be replayed independently of the others."""
+        return mix(index, self.seed)
+
+    def seating(self, index):
+        """Decode the index of a seating into a tuple of five competitors."""
+        candidates = self.competitors[:]
+        players = []
+        for _ in range(5):
+            index, i = divmod(index, len(candidates))
+            players.append(candidates.pop(i))
+        return tuple(players)
+
+    def __iter__(self):
+        if not self.size:
+            return
+        for i in range(self.rounds):
+            yield self[i]
+
+
+class BalancedSchedule(Schedule):
+    """Schedule of games in blocks that are balanced for every competitor.  In
+    each block of 10*n games for n competitors, every competitor plays every
+    seat 10 times, and as a spy in 4 of those games.
+
+    Blocks are made of 10 passes of n games, one for each role layout.  In a
+    pass, the competitors are seated in a random circular order, and the other
+    seats are filled at fixed distances around the circle, so each competitor
+    plays once per seat.  The distances are picked so the opponents are as
+    evenly spread as possible, and each pass uses a different random order."""
+
+    # Number of random sets of distances to pick from for each pass.
+    CANDIDATES = 16
+
+    def __init__(self, competitors, rounds, seed=None):
+        super(BalancedSchedule, self).__init__(competitors, rounds, seed)
+        n = len(self.competitors)
+        self.size = n * len(ROLES) if n >= 5 else 0
+        self._layouts = (None, None)
+        self._pass = (None, None)
+
+    def layouts(self, block):
+        """Random order of the role layouts for the passes of a block."""
+        if self._layouts[0] != block:
+            order = Permutation(len(ROLES), mix(self.seed, block))
+            self._layouts = (block, [ROLES[order[i]] for i in range(len(ROLES))])
+        return self._layouts[1]
+
+    def circle(self, block, index):
+        """Random order of the competitors, and distances between the seats,
+        for one pass of a block."""
+        if self._pass[0] != (block, index):
+            n = len(self.competitors)
+            key = mix(mix(self.seed, block), index + 1)
+            order = Permutation(n, key)
+            candidates = [Permutation(n - 1, mix(key, c)) for c in range(self.CANDIDATES)]
+            distances = min([[0] + [p[i] + 1 for i in range(4)] for p in candidates], key=self.spread)
+            self._pass = ((block, index), ([self.competitors[order[i]] for i in range(n)], distances))
+        return self._pass[1]
+
+    def spread(self, distances):
+        """Difference between the most and least frequent distances between
+        two players at the table, as each distance is a different opponent."""
+        counts = [0] * len(self.competitors)
+        for a, b in itertools.permutations(distances, 2):
+            counts[(a - b) % len(counts)] += 1
+        return max(counts[1:]) - min(counts[1:])
+
+    def __getitem__(self, index):
+        block, offset = divmod(index, self.size)
+        layout, first = divmod(offset, len(self.competitors))
+        order, distances = self.circle(block, layout)
+        return tuple(order[(first + d) % len(order)] for d in distances), self.layouts(block)[layout]
+
+
+def balance(games):
+    """Measure how balanced a list of (players, roles) games is for each bot,
+    returned as a dictionary from bot names to tuples with the number of
+    games, the fraction as spy, the ratio between the most and least played
+    seats, and the same ratio for the number of games with each opponent."""
+    seats = collections.defaultdict(lambda: [0] * 5)
+    spies = collections.defaultdict(int)
+    opponents = collections.defaultdict(collections.Counter)
+    for players, roles in games:
+        names = [p.__name__ for p in players]
+        for i, (name, spy) in enumerate(zip(names, roles)):
+            seats[name][i] += 1
+            spies[name] += int(spy)
+            opponents[name].update(names[:i] + names[i+1:])
+
+    def ratio(counts):
+        counts = list(counts)
+        return float(max(counts)) / min(counts) if min(counts) else float('inf')
+
+    result = {}
+    for name, s in seats.items():
+        others = [opponents[name][o] for o in seats if o != name]
+        result[name] = (sum(s), float(spies[name]) / sum(s), ratio(s), ratio(others) if others else 1.0)
+    return result
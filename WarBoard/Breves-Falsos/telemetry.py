@@ -0,0 +1,125 @@
+from __future__ import print_function
+
+import multiprocessing
+import json
+import time
+import sys
+import os
+
+
+# Columns of the row that each worker updates in shared memory.
+PID, GAMES, BUSY, STARTED, CURRENT = range(5)
+WIDTH = 5
+
+# Row of the shared table owned by this process, set by attach().
+row = None
+
+
+def attach(shared):
+    """Claim a row of the shared table for this worker process, typically
+    called once when the worker starts.  The rows are then updated for every
+    game without any communication with the runner."""
+    global row
+    table, claimed = shared
+    with claimed.get_lock():
+        slot = claimed.value
+        claimed.value += 1
+    if slot * WIDTH >= len(table):
+        return
+    row = (table, slot * WIDTH)
+    table[slot * WIDTH + PID] = os.getpid()
+
+
+def started(index):
+    if row is None:
+        return
+    table, i = row
+    table[i + CURRENT] = index
+    table[i + STARTED] = time.time()
+
+
+def finished(games=1):
+    if row is None:
+        return
+    table, i = row
+    table[i + GAMES] += games
+    table[i + BUSY] += time.time() - table[i + STARTED]
+    table[i + STARTED] = 0.0
+
+
+class Telemetry(object):
+    """Progress of a competition, from the counters of the runner and a table
+    in shared memory where each worker tracks the games it played and the one
+    it's playing.  The table is only available for pools created by the runner
+    itself, so other pools only report the progress of the whole competition."""
+
+    def __init__(self, processes, done=0, filename=None, interval=10.0, output=sys.stderr):
+        self.shared = (multiprocessing.Array('d', processes * WIDTH, lock=False), multiprocessing.Value('i', 0))
+        self.filename = filename
+        self.interval = interval
+        self.output = output
+        self.start = time.time()
+        self.reported = self.start
+        self.initial = done
+
+    def status(self, done, rounds, dispatched):
+        """Summary of the progress so far as a dictionary, see update()."""
+        now = time.time()
+        elapsed = max(now - self.start, 1e-6)
+        rate = (done - self.initial) / elapsed
+
+        table = self.shared[0]
+        workers, slowest, running = [], None, 0
+        for i in range(0, len(table), WIDTH):
+            pid, games, busy, started, current = table[i:i+WIDTH]
+            if not pid:
+                continue
+            duration = now - started if started else 0.0
+            w = {'pid': int(pid), 'games': int(games), 'rate': games / elapsed,
+                 'utilisation': min(1.0, (busy + duration) / elapsed), 'current': None, 'running': duration}
+            if started:
+                w['current'] = int(current)
+                running += 1
+                if slowest is None or duration > slowest['running']:
+                    slowest = {'pid': w['pid'], 'game': w['current'], 'running': duration}
+            workers.append(w)
+
+        # Games sent to the workers since the start that they haven't started.
+        played = sum(w['games'] for w in workers) if workers else done - self.initial
+        return {
+            'time': now,
+            'elapsed': elapsed,
+            'done': done,
+            'rounds': rounds,
+            'rate': rate,
+            'eta': (rounds - done) / rate if rate > 0.0 else None,
+            'queued': max(0, dispatched - played - running),
+            'workers': workers,
+            'slowest': slowest,
+        }
+
+    def line(self, s):
+        eta = "%i:%02i:%02i" % (s['eta'] // 3600, s['eta'] % 3600 // 60, s['eta'] % 60) if s['eta'] is not None else "?"
+        text = "[%3i%%] %i/%i games, %.1f games/s, ETA %s, %i queued" \
+               % (100 * s['done'] // max(s['rounds'], 1), s['done'], s['rounds'], s['rate'], eta, s['queued'])
+        if s['workers']:
+            text += ", %i workers %.0f%% busy" % (len(s['workers']), 100.0 * sum(w['utilisation'] for w in s['workers']) / len(s['workers']))
+        if s['slowest']:
+            text += ", slowest #%i for %.1fs" % (s['slowest']['game'], s['slowest']['running'])
+        return text
+
+    def update(self, done, rounds, dispatched, force=False):
+        """Print the status line and write the status file, at most once per
+        interval unless forced.  The number of games done includes those from
+        before the start, unlike the number of games dispatched to workers."""
+        if not force and time.time() - self.reported < self.interval:
+            return
+        self.reported = time.time()
+        s = self.status(done, rounds, dispatched)
+        if self.output:
+            print(self.line(s), file=self.output)
+        if self.filename:
+            temporary = self.filename + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(s, f, indent=2)
+            os.rename(temporary, self.filename)
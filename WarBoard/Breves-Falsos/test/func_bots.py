@@ -5,6 +5,7 @@ from inspect import isclass
 from game import Game
 from player import Bot
 from bots import beginners, intermediates, validators
+from logfolder import setUpModule, tearDownModule
 
 
 def run_game(cls):
@@ -0,0 +1,18 @@
+"""Module fixture shared by the tests that play games, so the bots write their
+logs to a temporary folder rather than the repository.  Import setUpModule and
+tearDownModule from here into the test module."""
+
+import tempfile
+import shutil
+
+import botlog
+
+
+def setUpModule():
+    botlog.configure('file', directory=tempfile.mkdtemp())
+
+
+def tearDownModule():
+    folder = botlog.folder
+    botlog.configure('file', directory=botlog.FOLDER)
+    shutil.rmtree(folder)
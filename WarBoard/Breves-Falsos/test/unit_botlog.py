@@ -0,0 +1,88 @@
+import unittest
+import logging
+import tempfile
+import shutil
+import os
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import botlog
+from competition import CompetitionRunner
+from bots.beginners import Hippie, Paranoid, RandomBot
+from logfolder import setUpModule, tearDownModule
+
+
+class TestPolicies(unittest.TestCase):
+
+    def tearDown(self):
+        botlog.configure('file')
+
+    def test_Silent(self):
+        botlog.configure('silent')
+        bot = Hippie(None, 0, False)
+        self.assertIs(bot.log, botlog.NULL)
+        bot.log.debug("Ignored %s", "message")
+
+    def test_SilentConfiguration(self):
+        # Bots that setup their own logger get the same no-op.
+        botlog.configure('silent')
+        log = botlog.getLogger('Configured')
+        if not log.handlers:
+            log.addHandler(logging.NullHandler())
+            log.setLevel(logging.DEBUG)
+        self.assertEqual(len(log.handlers), 0)
+
+    def test_Reconfigure(self):
+        log = botlog.getLogger('Configured')
+        self.assertEqual(len(log.handlers), 1)
+        botlog.configure('silent')
+        self.assertEqual(len(log.handlers), 0)
+
+
+class TestLogSink(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        botlog.configure('file')
+        shutil.rmtree(self.folder)
+
+    def read(self, name):
+        with open(os.path.join(self.folder, name)) as f:
+            return f.read().splitlines()
+
+    def test_Collected(self):
+        sink = botlog.LogSink(self.folder)
+        botlog.configure('collected', sink.queue)
+        for i in range(3):
+            botlog.getLogger('First').info("first %i", i)
+            botlog.getLogger('Second').info("second %i", i)
+        sink.close()
+
+        self.assertEqual(self.read('First.log'), ["first 0", "first 1", "first 2"])
+        self.assertEqual(self.read('Second.log'), ["second 0", "second 1", "second 2"])
+
+    def test_Rotation(self):
+        messages = queue.Queue()
+        for i in range(3):
+            messages.put(('Rotated', "line %i" % (i)))
+        messages.put(None)
+        botlog.write(messages, self.folder, maxBytes=1, backupCount=2, batch=1)
+
+        self.assertEqual(sorted(os.listdir(self.folder)), ['Rotated.log.1', 'Rotated.log.2'])
+        self.assertEqual(self.read('Rotated.log.1'), ["line 2"])
+        self.assertEqual(self.read('Rotated.log.2'), ["line 1"])
+
+    def test_Runner(self):
+        for logs in ['silent', 'collected']:
+            runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 20, quiet=True, processes=2, logs=logs)
+            runner.main()
+            self.assertEqual(runner.completed, [(0, 20)])
+
+
+if __name__ == "__main__":
+    unittest.main()
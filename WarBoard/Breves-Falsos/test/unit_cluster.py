@@ -0,0 +1,47 @@
+import unittest
+import multiprocessing
+
+import cluster
+from competition import CompetitionRunner
+from bots.beginners import Hippie, Paranoid, RandomBot
+from logfolder import setUpModule, tearDownModule
+
+
+class TestCoordinator(unittest.TestCase):
+
+    def setUp(self):
+        self.coordinator = cluster.Coordinator(('localhost', 0), [])
+        self.workers = [multiprocessing.Process(target=cluster.work, args=(self.coordinator.address,)) for _ in range(2)]
+        for w in self.workers:
+            w.start()
+
+    def tearDown(self):
+        self.coordinator.terminate()
+        for w in self.workers:
+            w.terminate()
+
+    def test_MatchesLocalPool(self):
+        remote = CompetitionRunner([Hippie, Paranoid, RandomBot], 200, quiet=True, seed=5, processes=2, pool=self.coordinator)
+        remote.main()
+        local = CompetitionRunner([Hippie, Paranoid, RandomBot], 200, quiet=True, seed=5, processes=1)
+        local.main()
+
+        self.assertEqual(remote.completed, [(0, 200)])
+        for name in local.statistics.names:
+            self.assertEqual([(v.total, v.samples) for v in remote.statistics[name]],
+                             [(v.total, v.samples) for v in local.statistics[name]])
+
+    def test_PublicAuthkey(self):
+        self.assertRaises(ValueError, cluster.Coordinator, ('0.0.0.0', 0), [])
+        self.assertRaises(ValueError, cluster.work, ('0.0.0.0', 7777))
+        cluster.Coordinator(('0.0.0.0', 0), [], authkey=b'secret').terminate()
+
+    def test_WorkerDisconnects(self):
+        self.workers[0].terminate()
+        runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 100, quiet=True, processes=2, pool=self.coordinator)
+        runner.main()
+        self.assertEqual(runner.completed, [(0, 100)])
+
+
+if __name__ == "__main__":
+    unittest.main()
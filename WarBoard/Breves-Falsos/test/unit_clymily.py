@@ -0,0 +1,80 @@
+import unittest
+import weakref
+import random
+import gc
+import sys
+import os
+
+import logfolder
+from logfolder import tearDownModule
+
+
+def setUpModule():
+    global clymily
+    if sys.version_info[0] > 2:
+        raise unittest.SkipTest("clymily only runs under Python 2.")
+    # The bot opens its database in the folder of the logs when imported.
+    logfolder.setUpModule()
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bots', '1'))
+    import clymily
+
+
+class TestStatBase(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = clymily.StatBase()
+        self.rng = random.Random(0)
+
+    def pick(self):
+        """Random arguments for a topic, from small ranges so the keys of the
+        samples and lookups overlap often."""
+        r = self.rng
+        actor, partner = r.sample(['A', 'B', 'C'], 2)
+        tsize, isspy, isleader = r.choice([2, 3]), r.choice([True, False]), r.choice([True, False])
+        greens, vround = r.randint(0, 2), r.randint(1, 3)
+        team = r.choice(list(clymily.StatBase._allCanonical(tsize, isspy)))
+        kind = r.choice('MVCS')
+        if kind == 'M':
+            actors = [actor, partner][:r.choice([1, 2])]
+            output = r.randint(0, len(actors))
+            return kind, (output, tsize, actors, greens), ('m', tsize, len(actors), output), tuple(actors) + (greens,)
+        if kind == 'V':
+            return kind, (isspy, team, actor, isleader, greens, vround), ('v', isspy, team), (actor, isleader, greens, vround)
+        if kind == 'C':
+            return kind, (tsize, actor, partner, isleader, greens), ('c', tsize), (actor, partner, isleader, greens)
+        return kind, (team, isspy, actor, greens, vround), ('s', isspy, team), (actor, greens, vround)
+
+    def test_CachedMatchesEstimate(self):
+        s = self.stats
+        lookups = 0
+        for _ in range(20000):
+            kind, args, topic, fullkey = self.pick()
+            action = self.rng.random()
+            if action < 0.45:
+                updown = self.rng.choice([True, False])
+                getattr(s, 'addSample' + kind)(updown, *args)
+            elif action < 0.47:
+                # Changes made directly to the variables require forget().
+                s._data[topic][fullkey].sample(1.0)
+                s.forget()
+            else:
+                cached = getattr(s, 'getProb' + kind)(*args)
+                self.assertEqual(cached, s._estimateProb(s._data[topic], fullkey))
+                lookups += 1
+        self.assertGreater(len(s._estimates), 0)
+        self.assertGreater(lookups, 10000)
+
+    def test_Reload(self):
+        s = self.stats
+        s.load()
+        s.addSampleC(True, 2, 'A', 'B', False, 0)
+        previous = weakref.ref(s._db)
+        # The new samples are flushed, and nothing keeps the old database open.
+        s.load()
+        gc.collect()
+        self.assertIsNone(previous())
+        self.assertEqual(s._data[('c', 2)][('A', 'B', False, 0)].samples, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,439 @@
+import collections
+import unittest
+import threading
+import tempfile
+import shutil
+import json
+import time
+import os
+
+from schedule import Schedule, BalancedSchedule, Permutation, ROLES, balance
+from competition import CompetitionStatistics, CompetitionRunner, sharedPool
+from util import Difference
+import telemetry
+from latency import Histogram, Latency
+from deadline import Deadlines, Timeout
+from bots.beginners import Hippie, Paranoid, RandomBot, Deceiver, RuleFollower, Neighbor, Jammer
+from logfolder import setUpModule, tearDownModule
+
+
+class TestPermutation(unittest.TestCase):
+
+    def test_Bijection(self):
+        for size in [1, 2, 7, 64, 1000]:
+            p = Permutation(size, key=size)
+            self.assertEqual(sorted(p[i] for i in range(size)), list(range(size)))
+
+    def test_KeyChangesOrder(self):
+        a, b = Permutation(1000, key=1), Permutation(1000, key=2)
+        self.assertNotEqual([a[i] for i in range(1000)], [b[i] for i in range(1000)])
+
+
+class TestSchedule(unittest.TestCase):
+
+    def setUp(self):
+        self.bots = ['A', 'B', 'C', 'D', 'E', 'F']
+        self.schedule = Schedule(self.bots, rounds=20000, seed=42)
+
+    def test_Size(self):
+        self.assertEqual(len(ROLES), 10)
+        self.assertEqual(self.schedule.size, 6 * 5 * 4 * 3 * 2 * 10)
+
+    def test_AllPermutationsBeforeRepeats(self):
+        size = self.schedule.size
+        games = list(self.schedule)
+        for epoch in range(2):
+            chunk = games[epoch * size:(epoch + 1) * size]
+            self.assertEqual(len(set(chunk)), size)
+        self.assertNotEqual(games[:size], games[size:2 * size])
+
+    def test_RandomAccess(self):
+        games = list(self.schedule)
+        for i in [0, 1, 7199, 7200, 19999, 5]:
+            self.assertEqual(self.schedule[i], games[i])
+
+    def test_Reproducible(self):
+        other = Schedule(self.bots, rounds=100, seed=42)
+        self.assertEqual(list(other), list(self.schedule)[:100])
+
+    def test_TooFewCompetitors(self):
+        self.assertEqual(list(Schedule(['A', 'B'], rounds=10)), [])
+
+
+class TestBalancedSchedule(unittest.TestCase):
+
+    def setUp(self):
+        self.bots = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
+        self.schedule = BalancedSchedule(self.bots, rounds=280, seed=42)
+
+    def count(self, games):
+        seats = dict((b, [0] * 5) for b in self.bots)
+        spies = dict((b, 0) for b in self.bots)
+        for players, roles in games:
+            self.assertEqual(len(set(players)), 5)
+            for i, (p, r) in enumerate(zip(players, roles)):
+                seats[p][i] += 1
+                spies[p] += int(r)
+        return seats, spies
+
+    def test_Block(self):
+        games = list(self.schedule)
+        for block in range(2):
+            seats, spies = self.count(games[block * 70:(block + 1) * 70])
+            for b in self.bots:
+                self.assertEqual(seats[b], [10] * 5)
+                self.assertEqual(spies[b], 20)
+
+    def test_Pass(self):
+        seats, spies = self.count(self.schedule[i] for i in range(7))
+        for b in self.bots:
+            self.assertEqual(seats[b], [1] * 5)
+            self.assertEqual(spies[b], 2)
+
+    def test_RandomAccess(self):
+        games = list(self.schedule)
+        for i in [0, 69, 70, 279, 5]:
+            self.assertEqual(self.schedule[i], games[i])
+
+    def test_Balance(self):
+        bots = [Paranoid, Hippie, RandomBot, Deceiver, RuleFollower, Neighbor, Jammer]
+        games, spy, seats, opponents = balance(BalancedSchedule(bots, 700)).pop('Hippie')
+        self.assertEqual((games, spy, seats), (500, 0.4, 1.0))
+        self.assertLess(opponents, 1.2)
+
+
+class TestCompetitionStatistics(unittest.TestCase):
+
+    def setUp(self):
+        self.a = CompetitionStatistics(['A', 'B'])
+        self.a.sample('A', 'resWins', 1)
+        self.a.sample('B', 'spyWins', 0)
+        self.b = CompetitionStatistics()
+        self.b.sample('C', 'spyVoted', 1)
+        self.b.sample('B', 'spyWins', 1)
+
+    def test_Sample(self):
+        self.assertEqual(self.a['A'].resWins.total, 1)
+        self.assertEqual(self.a['A'].resWins.samples, 1)
+        self.assertEqual(self.a['B'].total().samples, 1)
+
+    def test_MergeAligned(self):
+        self.a += self.a
+        self.assertEqual(self.a['A'].resWins.samples, 2)
+        self.assertEqual(len(self.a), 2)
+
+    def test_MergeUnaligned(self):
+        self.a += self.b
+        self.assertEqual(self.a.names, ['A', 'B', 'C'])
+        self.assertEqual(self.a['B'].spyWins.total, 1)
+        self.assertEqual(self.a['B'].spyWins.samples, 2)
+        self.assertEqual(self.a['C'].spyVoted.samples, 1)
+
+    def test_Intervals(self):
+        self.a += self.b
+        for name, (value, error) in self.a.intervals().items():
+            total = self.a[name].total()
+            self.assertAlmostEqual(value, total.value())
+            self.assertAlmostEqual(error, total.error())
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'competition.checkpoint')
+        self.runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 100, quiet=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_Ranges(self):
+        self.runner.complete(10, 20)
+        self.runner.complete(0, 5)
+        self.runner.complete(5, 10)
+        self.runner.complete(30, 40)
+        self.assertEqual(self.runner.completed, [(0, 20), (30, 40)])
+        self.assertEqual(self.runner.unfinished(), [(20, 30), (40, 100)])
+
+    def test_Resume(self):
+        self.runner.complete(0, 50)
+        self.runner.statistics.sample('Hippie', 'resWins', 1)
+        self.runner.save(self.filename)
+
+        other = CompetitionRunner([Hippie, Paranoid, RandomBot], 100, quiet=True)
+        other.resume(self.filename)
+        self.assertEqual(other.schedule[70], self.runner.schedule[70])
+        self.assertEqual(other.unfinished(), [(50, 100)])
+        self.assertEqual(other.statistics['Hippie'].resWins.samples, 1)
+
+
+class TestSeeding(unittest.TestCase):
+
+    def test_RerunMatchesCompetition(self):
+        runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 50, quiet=True, seed=7)
+        expected = CompetitionStatistics()
+        for index in range(50):
+            expected += runner.rerun(index).statistics
+
+        for processes in [1, 3]:
+            other = CompetitionRunner([Hippie, Paranoid, RandomBot], 50, quiet=True, seed=7, processes=processes)
+            other.main()
+            self.assertEqual(sorted(other.statistics.names), sorted(expected.names))
+            for name in expected.names:
+                self.assertEqual([(v.total, v.samples) for v in other.statistics[name]],
+                                 [(v.total, v.samples) for v in expected[name]])
+
+
+class Lonely(CompetitionRunner):
+    """Runner where only the ranking of Paranoid is in question, so it races
+    alone from the start."""
+
+    def contenders(self):
+        return [n for n in super(Lonely, self).contenders() if n == 'Paranoid']
+
+
+class TestRacing(unittest.TestCase):
+
+    def test_LastContender(self):
+        runner = Lonely([Hippie, Paranoid, RandomBot, Deceiver], 5000, quiet=True, racing=True, seed=2, processes=1)
+        runner.main()
+        self.assertGreaterEqual(runner.statistics['Paranoid'].total().samples, runner.RACING_GAMES)
+        self.assertLess(runner.completed[-1][1], 5000)
+
+
+class Agreeable(Hippie):
+    """Bot that votes up missions depending on a class-level parameter."""
+
+    agree = False
+
+    def vote(self, team):
+        return self.agree
+
+
+def configure(agree):
+    Agreeable.agree = agree
+
+
+class TestSharedPool(unittest.TestCase):
+
+    def test_Configure(self):
+        pool = sharedPool(2)
+        self.assertIs(pool, sharedPool())
+
+        for agree in [False, True, False]:
+            runner = CompetitionRunner([Agreeable, Paranoid, RandomBot], 20, quiet=True, processes=2,
+                                       pool=pool, configure=(configure, (agree,)))
+            runner.main()
+            votes = runner.statistics['Agreeable'].resVotesRes
+            self.assertEqual(votes.total, votes.samples if agree else 0)
+
+
+class Faulty(Hippie):
+    """Bot that fails to pick a team once in each process, while the other
+    blocks of games keep completing."""
+
+    calls = 0
+
+    def select(self, players, count):
+        Faulty.calls += 1
+        if Faulty.calls == 100:
+            raise ValueError("Faulty bot failed to select a team.")
+        return Hippie.select(self, players, count)
+
+
+class TestFailures(unittest.TestCase):
+
+    def test_Raises(self):
+        runner = CompetitionRunner([Faulty, Paranoid, RandomBot], 2000, quiet=True, seed=3, processes=2)
+        errors = []
+
+        def main():
+            try:
+                runner.main()
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=main)
+        thread.daemon = True
+        thread.start()
+        thread.join(60.0)
+        self.assertFalse(thread.is_alive(), "The competition hung after a block of games failed.")
+        self.assertEqual([type(e) for e in errors], [ValueError])
+
+
+class TestLatency(unittest.TestCase):
+
+    def test_Percentile(self):
+        h = Histogram()
+        for _ in range(99):
+            h.sample(0.000010)
+        h.sample(0.5)
+        self.assertEqual(h.samples, 100)
+        self.assertLess(h.percentile(0.5), 0.0001)
+        self.assertEqual(h.percentile(1.0), 0.5)
+
+    def test_Runner(self):
+        runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 20, quiet=True, processes=1, latency=True)
+        runner.main()
+        votes = runner.latency.histograms[('Hippie', 'vote')]
+        self.assertGreater(votes.samples, 0)
+        self.assertEqual(set(name for name, _ in runner.latency.costs()), set(['Hippie', 'Paranoid', 'RandomBot']))
+
+
+class Sluggish(Hippie):
+    """Bot that takes far too long to pick a team, ignoring interruptions."""
+
+    def select(self, players, count):
+        while True:
+            try:
+                time.sleep(1.0)
+            except Exception:
+                pass
+
+
+class Nested(Hippie):
+    """Bot that asks itself for a vote, then takes too long to pick a team."""
+
+    def select(self, players, count):
+        self.vote(players[:count])
+        time.sleep(1.0)
+        return players[:count]
+
+
+class Dawdler(Hippie):
+    """Bot that takes a while to pick a team, but less than its budget."""
+
+    def select(self, players, count):
+        time.sleep(0.15)
+        return players[:count]
+
+
+class TestDeadlines(unittest.TestCase):
+
+    def test_BudgetPerBot(self):
+        slow, fast = Dawdler(None, 0, False), Hippie(None, 1, False)
+        table = collections.namedtuple('Table', ['bots'])([slow, fast])
+        Deadlines(game=0.25).instrument(table)
+        slow.select([slow, fast], 1)
+        # Time spent outside the bots, e.g. in the engine, isn't charged to
+        # the next bot that is called.
+        time.sleep(0.15)
+        fast.vote([slow])
+        try:
+            slow.select([slow, fast], 1)
+        except Timeout as t:
+            self.assertIs(t.bot, slow)
+        else:
+            self.fail("Dawdler did not run out of time.")
+
+    def test_NestedCalls(self):
+        bot = Nested(None, 0, False)
+        table = collections.namedtuple('Table', ['bots'])([bot])
+        Deadlines(0.1).instrument(table)
+        start = time.time()
+        self.assertRaises(Timeout, bot.select, [bot], 1)
+        self.assertLess(time.time() - start, 0.5)
+
+    def test_Forfeit(self):
+        runner = CompetitionRunner([Sluggish, Paranoid, RandomBot], 0, quiet=True, timeout=0.01, seed=1)
+        for i in range(50):
+            g = runner.rerun(i)
+            if [b.name for b in g.bots].count('Sluggish') != 1:
+                continue
+            self.assertEqual(g.forfeit.bot.name, 'Sluggish')
+            self.assertEqual(g.statistics['Sluggish'].forfeits.total, 1)
+            self.assertEqual(g.statistics['Sluggish'].total().total, 0)
+            break
+        else:
+            self.fail("Sluggish was not scheduled.")
+
+    def test_GameBudget(self):
+        runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 0, quiet=True, budget=1e-9)
+        g = runner.rerun(0)
+        self.assertTrue(g.forfeit)
+        self.assertEqual(sum(s.forfeits.total for _, s in g.statistics.items()), 1)
+
+
+class HippieClone(Hippie):
+    """Identical bot with another name, so paired games give the same results."""
+    pass
+
+
+class TestPaired(unittest.TestCase):
+
+    def test_Difference(self):
+        d = Difference()
+        for first, second in [(True, True), (True, False), (False, False), (True, False)]:
+            d.sample(first, second)
+        self.assertEqual(d.estimate(), 0.5)
+        d += Difference(0, 2, 4)
+        self.assertEqual(d.estimate(), 0.0)
+        self.assertEqual(d.samples, 8)
+
+    def test_IdenticalCandidates(self):
+        runner = CompetitionRunner([Paranoid, RandomBot, Deceiver], 40, quiet=True, processes=1, seed=5,
+                                   paired=(Hippie, HippieClone))
+        runner.main()
+        self.assertEqual(runner.difference.samples, 40)
+        self.assertEqual(runner.difference.better + runner.difference.worse, 0)
+        self.assertEqual(runner.statistics['Hippie'].total().total, runner.statistics['HippieClone'].total().total)
+
+    def test_CountedOnce(self):
+        runner = CompetitionRunner([Paranoid, RandomBot, Deceiver], 40, quiet=True, processes=1, seed=5,
+                                   paired=(Hippie, HippieClone))
+        runner.main()
+        samples = dict((name, s.total().samples) for name, s in runner.statistics.items())
+        self.assertEqual(samples['Hippie'], 40)
+        self.assertEqual(samples['HippieClone'], 40)
+        self.assertEqual(sum(samples.values()), 40 * 6)
+
+    def test_Resume(self):
+        runner = CompetitionRunner([Paranoid, RandomBot, Deceiver], 40, quiet=True, paired=(Hippie, Paranoid))
+        runner.difference.sample(True, False)
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'checkpoint.json')
+            runner.save(filename)
+            other = CompetitionRunner([Paranoid, RandomBot, Deceiver], 40, quiet=True, paired=(Hippie, Paranoid))
+            other.resume(filename)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(other.difference.better, 1)
+        self.assertEqual(other.difference.samples, 1)
+
+
+class TestTelemetry(unittest.TestCase):
+
+    def tearDown(self):
+        telemetry.row = None
+
+    def test_Slowest(self):
+        progress = telemetry.Telemetry(2, output=None)
+        telemetry.attach(progress.shared)
+        telemetry.started(7)
+        s = progress.status(0, 10, 3)
+        self.assertEqual(s['slowest']['game'], 7)
+        self.assertEqual(s['queued'], 2)
+
+        telemetry.finished()
+        s = progress.status(1, 10, 3)
+        self.assertIsNone(s['slowest'])
+        self.assertEqual([w['games'] for w in s['workers']], [1])
+
+    def test_StatusFile(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'status.json')
+            runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 40, quiet=True, processes=2, status=filename)
+            runner.main()
+            with open(filename) as f:
+                status = json.load(f)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(status['done'], 40)
+        self.assertEqual(status['queued'], 0)
+        self.assertEqual(sum(w['games'] for w in status['workers']), 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
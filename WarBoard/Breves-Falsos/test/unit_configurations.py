@@ -0,0 +1,42 @@
+import itertools
+import unittest
+
+import configurations
+from player import Player
+
+
+class TestConfigurations(unittest.TestCase):
+
+    def test_Space(self):
+        for players, spies in sorted(configurations.SPIES.items()):
+            space = configurations.space(players - 1, spies)
+            self.assertTrue(configurations.space(players - 1, spies) is space)
+            self.assertEqual(len(space), len(list(itertools.combinations(range(players - 1), spies))))
+
+            # The masks are in the same order as the tuples the bots used.
+            configs = list(set(itertools.permutations([True] * spies + [False] * (players - 1 - spies))))
+            seats = list(range(players - 1))
+            self.assertEqual([configurations.members(seats, m) for m in space.permutations],
+                             [[i for i, spy in enumerate(c) if spy] for c in configs])
+            self.assertEqual([configurations.members(seats, m) for m in space.keys],
+                             [[i for i, spy in enumerate(c) if spy] for c in {k: 0.0 for k in configs}])
+            self.assertEqual([configurations.members(seats, m) for m in space.combinations],
+                             [list(c) for c in itertools.combinations(seats, spies)])
+
+    def test_Filters(self):
+        seats = [Player('Bot%i' % i, i) for i in range(9)]
+        team = configurations.mask(seats, [seats[0], seats[4], seats[8]])
+        self.assertEqual(configurations.members(seats, team), [seats[0], seats[4], seats[8]])
+
+        space = configurations.space(9, 3)
+        for sabotaged in range(4):
+            exact = configurations.exact(space.combinations, team, sabotaged)
+            atLeast = configurations.atLeast(space.combinations, team, sabotaged)
+            self.assertEqual(exact, [c for c in space.combinations if len([i for i in (0, 4, 8) if c >> i & 1]) == sabotaged])
+            self.assertEqual(atLeast, [c for c in space.combinations if configurations.count(c, team) >= sabotaged])
+        self.assertEqual(len(configurations.exact(space.combinations, team, 3)), 1)
+        self.assertEqual(len(configurations.atLeast(space.combinations, team, 0)), len(space))
+
+
+if __name__ == "__main__":
+    unittest.main()
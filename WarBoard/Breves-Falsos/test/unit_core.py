@@ -0,0 +1,77 @@
+import unittest
+
+import core
+
+
+def makeBase():
+    """Create a root class for the observers as Bot would be, in a way that
+    works with both Python 2 and 3 metaclass syntax."""
+    def onEvent(self, value):
+        self.calls.append(('Bot', value))
+    def __init__(self):
+        self.calls = []
+    return core.Observable('Bot', (object,), {'onEvent': onEvent, '__init__': __init__})
+
+
+class TestObservable(unittest.TestCase):
+
+    def setUp(self):
+        Bot = self.Bot = makeBase()
+
+        def hook(label):
+            def onEvent(self, value):
+                self.calls.append((label, value))
+            return onEvent
+
+        self.First = core.Observable('First', (Bot,), {'onEvent': hook('First')})
+        self.Second = core.Observable('Second', (self.First,), {'onEvent': hook('Second')})
+        self.Empty = core.Observable('Empty', (self.Second,), {})
+
+    def test_Order(self):
+        bot = self.Second()
+        bot.onEvent(1)
+        self.assertEqual(bot.calls, [('First', 1), ('Second', 1), ('Bot', 1)])
+
+    def test_Chains(self):
+        self.assertEqual(self.Bot.__chains__['onEvent'], ())
+        self.assertEqual(len(self.Empty.__chains__['onEvent']), 2)
+        bot = self.Empty()
+        bot.onEvent(2)
+        self.assertEqual(bot.calls, [('First', 2), ('Second', 2), ('Bot', 2)])
+
+    def test_Super(self):
+        bot = self.Second()
+        super(self.First, bot).onEvent(3)
+        self.assertEqual(bot.calls, [('First', 3), ('Second', 3), ('Bot', 3)])
+
+    def test_MixinFirst(self):
+        class Mixin(object):
+            def onEvent(self, value):
+                self.calls.append(('Mixin', value))
+
+        bot = core.Observable('Mixed', (Mixin, self.Second), {})()
+        bot.onEvent(4)
+        self.assertEqual(bot.calls, [('Mixin', 4)])
+
+    def test_MixinLast(self):
+        class Mixin(object):
+            def onEvent(self, value):
+                self.calls.append(('Mixin', value))
+                super(Mixin, self).onEvent(value)
+
+        Mixed = core.Observable('Mixed', (self.First, Mixin, self.Bot), {})
+        self.assertEqual(Mixed.__mro__[:3], (Mixed, self.First, Mixin))
+        bot = Mixed()
+        bot.onEvent(5)
+        self.assertEqual(bot.calls, [('Mixin', 5), ('First', 5), ('Bot', 5)])
+
+    def test_Overrides(self):
+        Other = core.Observable('Other', (self.Bot,), {'onOther': lambda self: None})
+        self.assertFalse(core.overrides(self.Bot, 'onEvent', self.Bot))
+        self.assertFalse(core.overrides(Other, 'onEvent', self.Bot))
+        self.assertTrue(core.overrides(self.First, 'onEvent', self.Bot))
+        self.assertTrue(core.overrides(self.Empty, 'onEvent', self.Bot))
+
+
+if __name__ == "__main__":
+    unittest.main()
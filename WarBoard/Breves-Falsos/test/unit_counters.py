@@ -0,0 +1,111 @@
+import multiprocessing
+import threading
+import unittest
+import tempfile
+import shutil
+import os
+
+import counters
+
+
+def append(folder, seed):
+    db = counters.Database(folder)
+    for i in range(300):
+        key = ('topic', (seed + i) % 7)
+        db.add(counters.digest(key), key, 1.0)
+        if i % 50 == 49:
+            db.flush()
+
+
+class TestCounters(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_Reopen(self):
+        db = counters.Database(self.folder)
+        variables = counters.Counters(db, ('v', True))
+        variables[('Hippie', None)].sample(1)
+        variables[('Hippie', None)].sample(0)
+        variables[('Paranoid', 2)].sample(1)
+        db.flush()
+
+        # Until compacted, the samples are replayed from the log.
+        variables = counters.Counters(counters.Database(self.folder), ('v', True))
+        self.assertTrue(('Hippie', None) in variables)
+        self.assertFalse(('Hippie', 2) in variables)
+        self.assertEqual((variables[('Hippie', None)].total, variables[('Hippie', None)].samples), (1, 2))
+
+        db.compact()
+        db = counters.Database(self.folder)
+        self.assertEqual((len(db.table), db.pending), (2, {}))
+        variables = counters.Counters(db, ('v', True))
+        self.assertEqual(sorted(variables.keys()), [('Hippie', None), ('Paranoid', 2)])
+        self.assertEqual(variables[('Paranoid', 2)].total, 1)
+        self.assertEqual(len(counters.Counters(db, ('v', False))), 0)
+
+    def test_Writers(self):
+        processes = [multiprocessing.Process(target=append, args=(self.folder, i)) for i in range(4)]
+        for p in processes:
+            p.start()
+        counters.Database.COMPACT, compact = 256, counters.Database.COMPACT
+        try:
+            append(self.folder, 4)
+        finally:
+            counters.Database.COMPACT = compact
+        for p in processes:
+            p.join()
+
+        db = counters.Database(self.folder)
+        samples = sum(db.get(counters.digest(('topic', i)))[1] for i in range(7))
+        self.assertEqual(samples, 5 * 300)
+        self.assertEqual(len(db.keys()), 7)
+
+    def test_OpenDuringCompaction(self):
+        db = counters.Database(self.folder)
+        db.add(counters.digest('a'), 'a', 2.0)
+        db.flush()
+        opened = []
+        with counters.Lock(os.path.join(self.folder, 'compacting')):
+            reader = threading.Thread(target=lambda: opened.append(counters.Database(self.folder)))
+            reader.start()
+            reader.join(0.2)
+            self.assertEqual(opened, [])
+            # Compact by hand: the log moves to a segment absorbed by the table.
+            os.rename(os.path.join(self.folder, 'log'), os.path.join(self.folder, 'log.1'))
+            counters.Table.write(os.path.join(self.folder, 'table'), {counters.digest('a'): (2.0, 1)}, 1)
+            os.remove(os.path.join(self.folder, 'log.1'))
+        reader.join()
+        self.assertEqual(opened[0].get(counters.digest('a')), (2.0, 1))
+
+    def test_Crash(self):
+        db = counters.Database(self.folder)
+        db.add(counters.digest('a'), 'a', 2.0)
+        db.flush()
+        db.compact()
+        db.add(counters.digest('a'), 'a', 3.0)
+        db.flush()
+
+        # A torn record is dropped, and the next batch is still aligned.
+        with open(os.path.join(self.folder, 'log'), 'ab') as f:
+            f.write(b'\x01\x02\x03')
+        self.assertEqual(counters.Database(self.folder).get(counters.digest('a')), (5.0, 2))
+        db.add(counters.digest('a'), 'a', 4.0)
+        db.flush()
+        self.assertEqual(counters.Database(self.folder).get(counters.digest('a')), (9.0, 3))
+
+        # Segments already in the table are not counted again.
+        os.rename(os.path.join(self.folder, 'log'), os.path.join(self.folder, 'log.2'))
+        with open(os.path.join(self.folder, 'log.1'), 'wb') as f:
+            f.write(counters.RECORD.pack(counters.digest('a'), 100.0, 100))
+        self.assertEqual(counters.Database(self.folder).get(counters.digest('a')), (9.0, 3))
+        db.compact()
+        self.assertEqual(sorted(os.listdir(self.folder)), ['compacting', 'keys', 'lock', 'table'])
+        self.assertEqual(counters.Database(self.folder).get(counters.digest('a')), (9.0, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
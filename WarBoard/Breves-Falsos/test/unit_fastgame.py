@@ -0,0 +1,64 @@
+import unittest
+import random
+
+from game import Game
+from fastgame import FastGame, PARTICIPANTS, SPIES, SEATS, bitmask
+from bots.beginners import Hippie, Paranoid, RandomBot, Deceiver, RuleFollower
+from logfolder import setUpModule, tearDownModule
+
+
+class Counter(RandomBot):
+    """Bot that keeps track of the size of the teams it votes for."""
+
+    def onGameRevealed(self, players, spies):
+        self.sizes = []
+        self.spies = spies
+
+    def vote(self, team):
+        self.sizes.append(len(team))
+        return super(Counter, self).vote(team)
+
+
+class TestFastGame(unittest.TestCase):
+
+    def test_Bitmask(self):
+        game = FastGame([Hippie] * 5, [True, False, False, True, False])
+        self.assertEqual(game.spies, 0b01001)
+        self.assertEqual(SEATS[game.spies], (0, 3))
+        self.assertEqual(bitmask(game.state.players[1:3]), 0b00110)
+
+    def test_MatchesGame(self):
+        bots = [Paranoid, Hippie, RandomBot, Deceiver, RuleFollower]
+        for seed in range(50):
+            roles = [True, True, False, False, False]
+            random.Random(seed).shuffle(roles)
+            results = []
+            for engine in [Game, FastGame]:
+                random.seed(seed)
+                g = engine(bots, roles)
+                g.run()
+                results.append((g.state.wins, g.state.losses, g.state.turn, g.state.tries))
+            self.assertEqual(results[0], results[1])
+
+    def test_Sizes(self):
+        for count in range(5, 11):
+            roles = [True] * SPIES[count] + [False] * (count - SPIES[count])
+            g = FastGame([Counter] * count, roles)
+            g.run()
+            bot = g.bots[0]
+            self.assertEqual(len(bot.spies), SPIES[count] if bot.spy else 0)
+            self.assertTrue(set(bot.sizes) <= set(PARTICIPANTS[count]))
+            self.assertTrue(g.won or g.lost or g.state.tries > g.MAX_TRIES)
+
+    def test_TwoFails(self):
+        small = FastGame([Hippie] * 6, [True, True, False, False, False, False])
+        large = FastGame([Hippie] * 7, [True, True, True, False, False, False, False])
+        for g in small, large:
+            g.state.turn = 4
+        self.assertTrue(small.failed(1))
+        self.assertFalse(large.failed(1))
+        self.assertTrue(large.failed(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
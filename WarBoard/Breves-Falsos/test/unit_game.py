@@ -3,7 +3,9 @@ import unittest
 import random
 
 from player import Player
-from game import State, BaseGame
+from game import State, BaseGame, Game
+from bots.beginners import Hippie, Paranoid, RandomBot
+from logfolder import setUpModule, tearDownModule
 
 
 class FakeGame(BaseGame):
@@ -175,5 +177,33 @@ class TestAnnouncements(unittest.TestCase):
         self.assertEquals(self.game.state.leader, self.game.state.players[1])
 
 
+class Observer(Hippie):
+    """Bot that keeps track of the number of completed votes."""
+
+    def onGameRevealed(self, players, spies):
+        self.votes = 0
+
+    def onVoteComplete(self, votes):
+        self.votes += 1
+
+
+class TestListeners(unittest.TestCase):
+
+    def setUp(self):
+        self.game = Game([Paranoid, Observer, RandomBot, Hippie, Observer], [False, True, False, True, False])
+
+    def test_Implemented(self):
+        observers = [self.game.bots[1], self.game.bots[4]]
+        self.assertEqual(self.game.listeners['onGameRevealed'], observers)
+        self.assertEqual(self.game.listeners['onVoteComplete'], observers)
+        self.assertEqual(self.game.listeners['onMissionComplete'], [])
+        self.assertEqual(self.game.listeners['announce'], [self.game.bots[2]])
+
+    def test_Callbacks(self):
+        self.game.run()
+        self.assertGreater(self.game.bots[1].votes, 2)
+        self.assertEqual(self.game.bots[1].votes, self.game.bots[4].votes)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+import logfolder
+from logfolder import tearDownModule
+from competition import CompetitionRound
+from bots.beginners import Hippie, Paranoid, RandomBot, Deceiver, Neighbor
+
+
+def setUpModule():
+    global master
+    try:
+        import master
+    except ImportError:
+        raise unittest.SkipTest("The IRC server requires gevent and geventirc.")
+    logfolder.setUpModule()
+
+
+class TestHandler(unittest.TestCase):
+
+    def test_PlayGame(self):
+        handler = master.ResistanceCompetitionHandler()
+        roles = [True, False, False, True, False]
+        g = handler.play(CompetitionRound, [Hippie, Paranoid, RandomBot, Deceiver, Neighbor], roles, "#game-00001")
+        for b in g.bots:
+            s = g.statistics[b.name]
+            if b.spy:
+                self.assertEqual((s.spyWins.total, s.spyWins.samples), (int(not g.won), 1))
+                self.assertEqual(s.resWins.samples, 0)
+            else:
+                self.assertEqual((s.resWins.total, s.resWins.samples), (int(g.won), 1))
+                self.assertEqual(s.spyWins.samples, 0)
+        self.assertEqual(handler.games, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import collections
+import unittest
+import tempfile
+import shutil
+
+import opponents
+from competition import CompetitionRunner, playBlock
+from bots.learners import Statistician
+from bots.beginners import RandomBot
+from logfolder import setUpModule, tearDownModule
+
+
+class Learner(RandomBot):
+    """Counts the games it played with each role, as a class-level model."""
+
+    games = collections.defaultdict(int)
+
+    def onGameComplete(self, win, spies):
+        self.games[self.spy] += 1
+
+
+class LearnerModel(opponents.Model):
+    modules = (__name__,)
+
+    def export(self, module):
+        for spy, count in module.Learner.games.items():
+            yield (spy,), count
+
+    def load(self, module, values):
+        for (spy,), count in values.items():
+            module.Learner.games[spy] = count
+
+
+class TestOpponents(unittest.TestCase):
+
+    def setUp(self):
+        opponents.MODELS['LearnerModel'] = LearnerModel()
+        Learner.games.clear()
+
+    def tearDown(self):
+        del opponents.MODELS['LearnerModel']
+        opponents.initial.pop('LearnerModel', None)
+        Learner.games.clear()
+        Statistician.global_statistics.clear()
+
+    def test_Merge(self):
+        table = opponents.Table()
+        version, changed = table.merge({('a',): 1.0, ('b',): 2.0}, 0)
+        self.assertEqual(changed, {('a',): 1.0, ('b',): 2.0})
+
+        # Only the counters changed since the last version are returned.
+        version, changed = table.merge({('a',): 0.5}, version)
+        self.assertEqual(changed, {('a',): 1.5})
+        version, changed = table.merge({}, version)
+        self.assertEqual(changed, {})
+        self.assertEqual(table.merge({}, 0)[1], {('a',): 1.5, ('b',): 2.0})
+
+        # The table only grows with the number of counters, not of merges.
+        for _ in range(100):
+            version, changed = table.merge({('a',): 1.0}, version)
+            self.assertEqual(list(changed), [('a',)])
+        self.assertEqual(len(table.versions), 2)
+        self.assertEqual(table.merge({}, 1)[1], {('a',): 101.5})
+
+    def test_Runner(self):
+        runner = CompetitionRunner([Learner], 40, quiet=True, seed=1, processes=2, share=True)
+        runner.main()
+        # The five Learners of each game are merged from both workers.
+        self.assertEqual(dict(Learner.games), {True: 2 * 40, False: 3 * 40})
+
+    def test_Private(self):
+        runner = CompetitionRunner([Learner], 20, quiet=True, seed=1, processes=2)
+        runner.main()
+        self.assertEqual(dict(Learner.games), {})
+
+    def test_Snapshot(self):
+        folder = tempfile.mkdtemp()
+        try:
+            Learner.games[True] = 4
+            Learner.games[False] = 6
+            opponents.save(folder, games=5)
+            Learner.games[True] = 10
+            filename = opponents.save(folder, games=7)[0]
+            self.assertEqual([v for v, _ in opponents.snapshots(folder, 'LearnerModel')], [1, 2])
+            self.assertEqual(opponents.read(filename)['games'], 12)
+
+            # The bots of a competition start from the latest version.
+            Learner.games.clear()
+            runner = CompetitionRunner([Learner], 10, quiet=True, seed=1, processes=1, models=folder)
+            runner.main()
+            self.assertEqual(dict(Learner.games), {True: 10, False: 6})
+        finally:
+            shutil.rmtree(folder)
+
+    def test_Reset(self):
+        Learner.games[True] = 3
+        opponents.reset()
+        Learner.games[True] = 4
+        Learner.games[False] = 5
+        opponents.reset()
+        self.assertEqual(dict(Learner.games), {True: 3, False: 0})
+
+    def test_NewCompetition(self):
+        # Workers of a shared pool reset the models when another competition starts.
+        runner = CompetitionRunner([Learner], 10, quiet=True, seed=1)
+        games = [runner.game(i) for i in range(10)]
+        playBlock(games, run=b'first')
+        playBlock(games, run=b'first')
+        self.assertEqual(sum(Learner.games.values()), 100)
+        playBlock(games, run=b'second')
+        self.assertEqual(sum(Learner.games.values()), 50)
+
+    def test_Statistician(self):
+        model = opponents.MODELS['Statistician']
+        module = model.module()
+        module.Statistician.global_statistics['Hippie'].spy_Sabotage.sample(1.0)
+        values = dict(model.export(module))
+        self.assertEqual(values[('Hippie', 'spy_Sabotage', 'samples')], 1)
+
+        values[('Hippie', 'spy_Sabotage', 'samples')] = 3
+        model.load(module, {('Hippie', 'spy_Sabotage', 'samples'): 3, ('Paranoid', 'res_PicksSpy', 'total'): 2})
+        self.assertEqual(module.Statistician.global_statistics['Hippie'].spy_Sabotage.samples, 3)
+        self.assertEqual(module.Statistician.global_statistics['Paranoid'].res_PicksSpy.total, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import recorder
+from competition import CompetitionRunner, playGame
+from bots.beginners import Hippie, Paranoid, RandomBot, Deceiver
+from logfolder import setUpModule, tearDownModule
+
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_Runner(self):
+        runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 30, quiet=True, processes=2, record=self.folder)
+        runner.main()
+
+        games = recorder.read(self.folder, 'games')
+        self.assertEqual(sorted(games['game']), [recorder.key(i) for i in range(30)])
+        seats = recorder.read(self.folder, 'seats')
+        self.assertEqual(len(seats['game']), 5 * 30)
+        self.assertEqual(sum(seats['spy']), 2 * 30)
+
+        # The mission outcomes add up to the score of each game.
+        missions = recorder.read(self.folder, 'missions')
+        for i, game in enumerate(games['game']):
+            sabotages = [s for g, s in zip(missions['game'], missions['sabotages']) if g == game]
+            self.assertEqual(games['wins'][i], sabotages.count(0))
+            self.assertEqual(games['losses'][i], len(sabotages) - sabotages.count(0))
+
+    def test_Rerun(self):
+        runner = CompetitionRunner([Hippie, Paranoid, RandomBot], 0, quiet=True, seed=3)
+        records = recorder.Recorder(self.folder, runner.recorded())
+        players, roles, seed = runner.game(7)
+        g = playGame((players, roles, seed), records=records, id=recorder.key(7))
+        records.flush()
+
+        attempts = recorder.read(self.folder, 'attempts')
+        self.assertEqual(set(attempts['game']), set([recorder.key(7)]))
+        missions = recorder.read(self.folder, 'missions')
+        self.assertEqual(len(missions['game']), g.state.wins + g.state.losses)
+        games = recorder.read(self.folder, 'games')
+        self.assertEqual(list(games['won']), [int(g.won)])
+        self.assertEqual((games['seedHigh'][0] << 32) | games['seedLow'][0], seed)
+
+    def test_Paired(self):
+        runner = CompetitionRunner([Paranoid, RandomBot, Deceiver], 10, quiet=True, processes=1,
+                                   paired=(Hippie, Paranoid), record=self.folder)
+        runner.main()
+        games = recorder.read(self.folder, 'games')
+        self.assertEqual(sorted(games['game']), list(range(20)))
+
+    def test_TornColumns(self):
+        records = recorder.Recorder(self.folder, ['Hippie'])
+        records.append('seats', 1, 0, 0, 0)
+        records.append('seats', 2, 1, 0, 1)
+        records.flush()
+        with open(os.path.join(records.shard, 'seats.game'), 'ab') as f:
+            f.write(b'\x03\x00')
+
+        seats = recorder.read(self.folder, 'seats')
+        self.assertEqual(list(seats['game']), [1, 2])
+        self.assertEqual(list(seats['spy']), [0, 1])
+
+    def test_ReusedPid(self):
+        records = recorder.Recorder(self.folder, ['Hippie'])
+        records.append('seats', 1, 0, 0, 0)
+        records.flush()
+        # A whole row of a single column is left by a crash, then a later run
+        # in a process with the same id records into the same folder.
+        with open(os.path.join(records.shard, 'seats.game'), 'ab') as f:
+            f.write(b'\x03\x00\x00\x00')
+        records = recorder.Recorder(self.folder, ['Hippie'])
+        records.append('seats', 4, 1, 0, 1)
+        records.flush()
+
+        seats = recorder.read(self.folder, 'seats')
+        self.assertEqual(sorted(zip(seats['game'], seats['spy'])), [(1, 0), (4, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import tempfile
+import shutil
+
+import replay
+from competition import CompetitionRunner
+from bots.beginners import Hippie, RandomBot, Neighbor
+from logfolder import setUpModule, tearDownModule
+
+
+class Contrarian(Neighbor):
+    """Modified bot that votes the other way on the second mission."""
+
+    def vote(self, team):
+        v = Neighbor.vote(self, team)
+        return not v if self.game.turn == 2 else v
+
+
+class TestReplay(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp()
+        runner = CompetitionRunner([Hippie, RandomBot, Neighbor], 30, quiet=True, processes=2, seed=11, record=cls.folder)
+        runner.main()
+        cls.records = replay.load(cls.folder)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder)
+
+    def test_Load(self):
+        self.assertEqual(len(self.records), 30)
+        for r in self.records.values():
+            self.assertEqual(len(r.bots), 5)
+            self.assertEqual(sum(r.roles.values()), 2)
+
+    def test_Identical(self):
+        diverged, count = replay.replayAll(self.records, Neighbor)
+        self.assertGreater(count, 0)
+        self.assertEqual(diverged, [])
+
+    def test_Game(self):
+        record = [r for r in self.records.values() if 'Neighbor' in r.bots][0]
+        g = replay.replay(record, Neighbor, record.bots.index('Neighbor'))
+        self.assertEqual(g.won, record.won)
+        self.assertEqual([b.name for b in g.bots], record.bots)
+
+    def test_Diverged(self):
+        diverged, count = replay.replayAll(self.records, Contrarian, 'Neighbor')
+        self.assertGreater(len(diverged), 0)
+        for id, seat, d in diverged:
+            self.assertEqual((d.method, d.turn), ('vote', 2))
+            self.assertEqual(d.actual, not d.recorded)
+
+
+if __name__ == "__main__":
+    unittest.main()
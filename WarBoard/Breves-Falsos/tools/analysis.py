@@ -2,20 +2,24 @@
 import itertools
 import multiprocessing
 
-from competition import CompetitionRunner
+from competition import CompetitionRunner, sharedPool
 
 from bots.cheaters import RandomCheater
 from sceptic import ScepticBot
 
 
-def main(arg):
+def configure(res, spy):
+    RandomCheater.cheat_SetRate(float(res) / 10.0, float(spy) / 10.0)
+
+
+def main(arg, pool):
     print '.',
     res, spy = arg
-    RandomCheater.cheat_SetRate(float(res) / 10.0, float(spy) / 10.0)
 
     # Score of this bot is calculated relative to the scores of all these other bots.
+    # The cheating rates are set in the worker processes before each block of games.
     competitors = [ScepticBot, RandomCheater, RandomCheater, RandomCheater, RandomCheater]
-    runner = CompetitionRunner(competitors, 250, quiet = True)
+    runner = CompetitionRunner(competitors, 250, quiet = True, pool = pool, configure = (configure, arg))
     runner.main()
 
     # TODO: Split the evaluation depending on whether the bot is Spy or Resistance.
@@ -36,9 +40,10 @@ if __name__ == '__main__':
     print " - 121 jobs run in total, for 250 games each."
     print " - Using %i threads to run the evaluations...\n" % multiprocessing.cpu_count()
 
-    pool = multiprocessing.Pool(processes=multiprocessing.cpu_count())
+    # Each job runs its games on the same pool of workers, instead of nesting.
+    pool = sharedPool()
     results = {}
-    for i, t in pool.map(main, itertools.product(range(11), range(11))):
+    for i, t in [main(arg, pool) for arg in itertools.product(range(11), range(11))]:
         results[i] = float(t)
 
     X, Y = np.meshgrid(range(11), range(11))
@@ -0,0 +1,220 @@
+from __future__ import print_function
+
+import collections
+import multiprocessing
+import platform
+import random
+import json
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import botlog
+from game import Game
+from fastgame import FastGame
+from competition import CompetitionRunner, getCompetitors, playBlock, setup, BOT_FOLDERS
+
+
+# Tables of bots that are benchmarked, by name.
+SUITES = collections.OrderedDict([
+    ('beginners', ['beginners']),
+    ('intermediates', ['intermediates']),
+    ('experts', ['experts.Suspicious', 'learners.Statistician', 'intermediates.Logicalton',
+                 'intermediates.Bounder', 'sceptic.ScepticBot', 'invalidator.Invalidator']),
+    ('competition', ['clymily', 'dkreuter', 'dmq', 'garboa', 'grumpy', 'hartbot', 'invalidator',
+                     'mp', 'opeth', 'pands', 'rebounder', 'sceptic']),
+])
+
+SEED = 2012
+
+
+def competitors(suite):
+    """Import the bots of a suite, from the folders that ship with the
+    framework.  Bots that fail to import are skipped with a warning."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for folder in BOT_FOLDERS:
+        path = os.path.join(root, folder)
+        if path not in sys.path:
+            sys.path.append(path)
+    bots = []
+    for name in SUITES[suite]:
+        try:
+            bots.extend(getCompetitors([name]))
+        except Exception as e:
+            print("WARNING: Skipping %s in suite %s, %s: %s" % (name, suite, type(e).__name__, e), file=sys.stderr)
+    return bots
+
+
+def single(bots, games, latency=False):
+    """Play the games in this process, without any pool, and return the time
+    it took along with the Latency if requested."""
+    runner = CompetitionRunner(bots, games, quiet=True, seed=SEED)
+    block = [runner.game(i) for i in range(games)]
+    start = time.time()
+    _, latency, _, _, _ = playBlock(block, latency=latency)
+    return time.time() - start, latency
+
+
+def engine(bots, games, cls):
+    """Play the games in this process with only an engine, either Game or the
+    bitmask FastGame, without the statistics of the competition, to compare
+    the cost of the engines themselves."""
+    runner = CompetitionRunner(bots, games, quiet=True, seed=SEED)
+    block = [runner.game(i) for i in range(games)]
+    start = time.time()
+    for players, roles, seed in block:
+        random.seed(seed)
+        cls(players, roles).run()
+    return time.time() - start
+
+
+def pooled(bots, games, pool, processes):
+    """Play the games with a pool of workers that was already started."""
+    runner = CompetitionRunner(bots, games, quiet=True, seed=SEED, processes=processes, pool=pool)
+    start = time.time()
+    runner.main()
+    return time.time() - start
+
+
+def measure(suite, games, processes, repeat):
+    """Games per second for a suite in this process and with each size of pool,
+    the best of a few repeats, and the latency of each call to the bots."""
+    bots = competitors(suite)
+    result = {'bots': [b.__name__ for b in bots], 'games': games, 'pools': {}}
+
+    result['single'] = games / min(single(bots, games)[0] for _ in range(repeat))
+    result['engines'] = {}
+    for cls in [Game, FastGame]:
+        try:
+            result['engines'][cls.__name__] = games / min(engine(bots, games, cls) for _ in range(repeat))
+        except Exception as e:
+            print("WARNING: Skipping engine %s in suite %s, %s: %s" % (cls.__name__, suite, type(e).__name__, e), file=sys.stderr)
+    for p in processes:
+        pool = multiprocessing.Pool(p, setup, ('silent',))
+        try:
+            # The first run imports the bots in the workers, and is ignored.
+            pooled(bots, p, pool, p)
+            result['pools'][str(p)] = games / min(pooled(bots, games, pool, p) for _ in range(repeat))
+        finally:
+            pool.terminate()
+
+    # Instrumented separately, since timing every call slows down the games,
+    # keeping the repeat where each bot was the fastest to reduce the noise.
+    latencies = [single(bots, games, latency=True)[1] for _ in range(repeat)]
+    result['latency'] = {}
+    for name in set(name for name, _ in latencies[0].costs()):
+        best = min(latencies, key=lambda l: dict(l.costs())[name])
+        result['latency'][name] = dict((method, {'calls': h.samples, 'mean': h.mean(), 'p99': h.percentile(0.99)})
+                                       for (n, method), h in best.histograms.items() if n == name and h.samples)
+    return result
+
+
+def run(args):
+    botlog.configure('silent')
+    baseline = {
+        'python': platform.python_implementation() + ' ' + platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': multiprocessing.cpu_count(),
+        'time': time.time(),
+        'seed': SEED,
+        'suites': {},
+    }
+    for suite in args.suites:
+        r = measure(suite, args.games, args.processes, args.repeat)
+        baseline['suites'][suite] = r
+        print("{0:<16s} {1:>10.1f} games/s".format(suite, r['single']), end='')
+        for p, rate in sorted(r['pools'].items(), key=lambda x: int(x[0])):
+            print("\t {0:>10.1f} with {1}".format(rate, p), end='')
+        for e, rate in sorted(r['engines'].items()):
+            print("\t {0:>10.1f} {1}".format(rate, e), end='')
+        print("")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def changes(base, new, threshold):
+    """Compare two baselines, listing the measurements that changed by more
+    than the threshold as (label, before, after, relative change in speed).
+    Games per second regress when they drop, and the time spent in each bot
+    per game when it grows.  The latency of each call is too noisy to compare
+    on its own, but it's stored in the baselines for reference."""
+    result = []
+    for suite, b in sorted(base['suites'].items()):
+        n = new['suites'].get(suite)
+        if n is None:
+            continue
+        rates = [('single', b['single'], n['single'])]
+        rates += [('pool %s' % p, r, n['pools'][p]) for p, r in sorted(b['pools'].items()) if p in n['pools']]
+        engines = n.get('engines', {})
+        rates += [('engine %s' % e, r, engines[e]) for e, r in sorted(b.get('engines', {}).items()) if e in engines]
+        for label, before, after in rates:
+            change = after / before - 1.0
+            if abs(change) > threshold:
+                result.append(("%s %s" % (suite, label), before, after, change))
+
+        for bot, methods in sorted(b['latency'].items()):
+            if bot not in n['latency']:
+                continue
+            before, after = [sum(m['calls'] * m['mean'] for m in l['latency'][bot].values()) / l['games']
+                             for l in (b, n)]
+            change = before / after - 1.0
+            if abs(change) > threshold:
+                result.append(("%s %s per game" % (suite, bot), before, after, change))
+    return result
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if base['python'] != new['python'] or base['cpus'] != new['cpus']:
+        print("WARNING: Comparing %s on %i cores with %s on %i cores." % (base['python'], base['cpus'], new['python'], new['cpus']))
+    for suite in set(base['suites']) & set(new['suites']):
+        if base['suites'][suite]['bots'] != new['suites'][suite]['bots']:
+            print("WARNING: The bots in suite %s are different." % (suite))
+
+    regressions, found = 0, False
+    for label, before, after, change in changes(base, new, args.threshold):
+        status = 'REGRESSION' if change < 0.0 else 'IMPROVEMENT'
+        regressions += int(change < 0.0)
+        found = True
+        print("{0:<12s} {1:<40s} {2:>12.6g} -> {3:<12.6g} {4:+6.1f}%".format(status, label, before, after, change * 100.0))
+    if not found:
+        print("No changes beyond %.0f%%." % (args.threshold * 100.0))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(usage='benchmark.py run --output=baseline.json | compare baseline.json new.json')
+    commands = parser.add_subparsers(dest='command')
+
+    r = commands.add_parser('run', help = "Measure the throughput of the game engine and bots.")
+    r.add_argument('--suites', nargs='+', choices=list(SUITES.keys()), default=list(SUITES.keys()),
+                help = "Tables of bots to benchmark.")
+    r.add_argument('--games', type=int, default=1000,
+                help = "Number of games played for each measurement.")
+    r.add_argument('--processes', type=int, nargs='*', default=sorted(set([2, multiprocessing.cpu_count()])),
+                help = "Sizes of the pools of workers to benchmark.")
+    r.add_argument('--repeat', type=int, default=3,
+                help = "Number of times each measurement is repeated, keeping the best.")
+    r.add_argument('--output', type=str, default=None,
+                help = "File where the results are stored as a JSON baseline.")
+
+    c = commands.add_parser('compare', help = "Flag the differences between two baselines.")
+    c.add_argument('base', type=str)
+    c.add_argument('new', type=str)
+    c.add_argument('--threshold', type=float, default=0.1,
+                help = "Relative change that is considered beyond the noise.")
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
@@ -1,7 +1,24 @@
 import sys
 from time import time
 import itertools
-from competition import CompetitionRunner, getCompetitors
+from competition import CompetitionRunner, getCompetitors, sharedPool
+
+
+class EliminationRunner(CompetitionRunner):
+    """Racing competition that only needs to find the last bot, so the games
+    focus on the bots that could still end up being eliminated."""
+
+    def contenders(self):
+        contenders = super(EliminationRunner, self).contenders()
+        intervals = self.statistics.intervals()
+        if not intervals:
+            return contenders
+
+        last = min(intervals, key = lambda n: intervals[n][0])
+        value, error = intervals[last]
+        return [n for n in contenders if n not in intervals                      \
+                or self.statistics[n].total().samples < self.RACING_GAMES        \
+                or abs(intervals[n][0] - value) < intervals[n][1] + error]
 
 
 if __name__ == '__main__':
@@ -14,13 +31,16 @@ if __name__ == '__main__':
                                 'aigd.Statistician', 'aigd.LogicalBot'])
     
     pool = competitors + opponents
+    # All the stages share the same worker processes, with bots preloaded.
+    workers = sharedPool()
     rnd = 1
     while len(pool) >= 5:
         r = int(sys.argv[1])
         if len(pool) == 5:
-            runner = CompetitionRunner(pool, rounds = int(r * 2.5), quiet = False)
+            runner = CompetitionRunner(pool, rounds = int(r * 2.5), quiet = False, pool = workers)
         else:
-            runner = CompetitionRunner(pool, rounds = r, quiet = True)
+            # Stop each elimination stage early once the last bot is clear.
+            runner = EliminationRunner(pool, rounds = r, quiet = True, racing = True, pool = workers)
         runner.main()
     
         if len(pool) == 5:
@@ -0,0 +1,68 @@
+from __future__ import print_function
+
+import multiprocessing
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from competition import CompetitionRunner, getCompetitors, BOT_FOLDERS
+import opponents
+
+
+# Learner bots that ship with the framework, and have a model in opponents.py.
+LEARNERS = ['learners.Statistician', 'clymily.Clymily', 'mp.Magi', 'dkreuter.KreuterBot']
+
+
+def competitors(names):
+    """Import bots by name or filename, from the folders that ship with the
+    framework too."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for folder in BOT_FOLDERS:
+        path = os.path.join(root, folder)
+        if path not in sys.path:
+            sys.path.append(path)
+    return getCompetitors(names)
+
+
+def train(args):
+    """Play games between the learners, and the league if any, with their
+    models shared across all the workers.  They start from the latest
+    snapshots in the folder, and a new version is written at the end."""
+    bots = competitors(args.learners + args.league)
+    for name, data in sorted(opponents.restore(args.output).items()):
+        print("Starting %s from version %i, trained on %i games." % (name, data['version'], data['games']), file=sys.stderr)
+
+    start = time.time()
+    runner = CompetitionRunner(bots, args.games, quiet=args.quiet, seed=args.seed, processes=args.processes,
+                               logs='silent', share=True)
+    runner.main()
+    elapsed = time.time() - start
+
+    for filename in opponents.save(args.output, games=args.games):
+        data = opponents.read(filename)
+        print("{0:<48s} {1:>10d} games {2:>8d} counters {3:>8.1f} KB".format(
+              filename, data['games'], len(data['counters']), os.path.getsize(filename) / 1024.0))
+    print("Trained for %i games in %.1fs (%.1f games/s)." % (args.games, elapsed, args.games / max(elapsed, 1e-6)))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(usage='training.py 100000 --output=models [--league bots/beginners.py]')
+    parser.add_argument('games', type=int,
+                help = "Number of games to train for.")
+    parser.add_argument('--output', type=str, default='models',
+                help = "Folder with the snapshots, where training resumes from the latest ones.")
+    parser.add_argument('--learners', type=str, nargs='+', default=LEARNERS,
+                help = "Bots that learn, which play against each other.")
+    parser.add_argument('--league', type=str, nargs='*', default=[],
+                help = "Other bots for the learners to play against, e.g. the field of a competition.")
+    parser.add_argument('--seed', type=int, required=False, default=None,
+                help = "Seed for the schedule and the games.")
+    parser.add_argument('--processes', type=int, required=False, default=multiprocessing.cpu_count(),
+                help = "Number of worker processes, by default one per core.")
+    parser.add_argument('--quiet', action='store_true',
+                help = "Don't report the progress while training.")
+    train(parser.parse_args())
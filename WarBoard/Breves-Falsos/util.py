@@ -2,6 +2,20 @@ import sys
 import math
 
 
+def interval(total, samples):
+    """Agresti-Coull estimate and error of a variable given its total and number
+    of samples, see Variable.detail() for the rationale."""
+    n_prime = samples + 3.84 # 95% confidence interval
+    value = (total + (3.84 * 0.5)) / n_prime
+    return value, 1.96 * math.sqrt(value * (1.0 - value) / n_prime)
+
+
+def intervals(totals, samples):
+    """Calculate the Agresti-Coull estimate and error of many variables at once,
+    given parallel lists of their totals and sample counts."""
+    return list(map(interval, totals, samples))
+
+
 class Variable(object):
     def __init__(self, total = 0.0, samples = 0):
         self.total = total 
@@ -22,13 +36,10 @@ class Variable(object):
             return 0.5
 
     def value(self):
-        n_prime = self.samples + 3.84 # 95% confidence interval
-        return (self.total + (3.84 * 0.5)) / n_prime
+        return interval(self.total, self.samples)[0]
 
     def error(self):
-        n_prime = self.samples + 3.84 # 95% confidence interval
-        value = self.value()
-        return 1.96 * math.sqrt(value * (1.0 - value) / n_prime)
+        return interval(self.total, self.samples)[1]
 
     # Error calculation courtesy of idmillington.
     def detail(self):
@@ -60,3 +71,44 @@ class Variable(object):
         self.samples += other.samples
         self.minimum = min(self.minimum, other.minimum)
         self.maximum = max(self.maximum, other.maximum)
+
+
+class Difference(object):
+    """Paired difference between the outcomes of two candidates, each sample
+    being a win or loss for both in otherwise identical conditions.  Since
+    the noise common to both is cancelled out, the error is much smaller than
+    when comparing two independent Variables."""
+
+    def __init__(self, better = 0, worse = 0, samples = 0):
+        self.better = better
+        self.worse = worse
+        self.samples = samples
+
+    def sample(self, first, second):
+        self.better += int(first and not second)
+        self.worse += int(second and not first)
+        self.samples += 1
+
+    def estimate(self):
+        if self.samples > 0:
+            return float(self.better - self.worse) / float(self.samples)
+        else:
+            return 0.0
+
+    def error(self):
+        """Half-width of the 95% confidence interval, based on the normal
+        approximation which is fine as differences are rarely extreme."""
+        if self.samples < 2:
+            return 1.0
+        mean = self.estimate()
+        variance = (float(self.better + self.worse) / self.samples - mean * mean) * self.samples / (self.samples - 1)
+        return 1.96 * math.sqrt(variance / self.samples)
+
+    def detail(self):
+        return "{:+4.1f}% (e={:4.2f} n={:d})".format(self.estimate()*100, self.error()*100, int(self.samples))
+
+    def __iadd__(self, other):
+        self.better += other.better
+        self.worse += other.worse
+        self.samples += other.samples
+        return self